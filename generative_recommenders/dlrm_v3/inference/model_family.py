@@ -236,6 +236,7 @@ class ModelFamilyDenseDist:
         self.main_lock.set()
         model = model.to(device)
         model.eval()
+        model.prepare_for_inference()
         profiler = Profiler(rank) if self.output_trace else None
 
         while True:
@@ -384,6 +385,7 @@ class ModelFamilyDenseSingleWorker:
         load_nonsparse_checkpoint(model=self.model, optimizer=None, path=model_path)
         assert self.model is not None
         self.model.eval()
+        self.model.prepare_for_inference()  # pyre-ignore [29]
 
     def predict(
         self,
@@ -33,9 +33,14 @@ from generative_recommenders.modules.contextualize_mlps import (
 )
 from generative_recommenders.modules.preprocessors import (
     get_contextual_input_embeddings,
+    get_contextual_position_info,
     InputPreprocessor,
 )
-from generative_recommenders.ops.jagged_tensors import concat_2D_jagged
+from generative_recommenders.ops.jagged_tensors import (
+    concat_1D_jagged,
+    concat_2D_jagged,
+    contextual_linear,
+)
 
 
 class ContextualInterleavePreprocessor(InputPreprocessor):
@@ -67,6 +72,29 @@ class ContextualInterleavePreprocessor(InputPreprocessor):
         self._contextual_feature_to_min_uih_length: Dict[str, int] = (
             contextual_feature_to_min_uih_length
         )
+        (
+            position_to_feature,
+            position_to_index,
+            position_min_uih_lengths,
+        ) = get_contextual_position_info(
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            contextual_feature_to_min_uih_length=contextual_feature_to_min_uih_length,
+        )
+        self.register_buffer(
+            "_contextual_position_to_feature",
+            position_to_feature,
+            persistent=False,
+        )
+        self.register_buffer(
+            "_contextual_position_to_index",
+            position_to_index,
+            persistent=False,
+        )
+        self.register_buffer(
+            "_contextual_position_min_uih_lengths",
+            position_min_uih_lengths,
+            persistent=False,
+        )
         std = 1.0 * sqrt(2.0 / float(input_embedding_dim + output_embedding_dim))
         self._batched_contextual_linear_weights = torch.nn.Parameter(
             torch.empty(
@@ -180,19 +208,14 @@ class ContextualInterleavePreprocessor(InputPreprocessor):
                 offsets_right=output_seq_offsets,
                 kernel=self.hammer_kernel(),
             )
-            output_seq_timestamps = concat_2D_jagged(
-                values_left=torch.zeros(
-                    (output_seq_lengths.size(0) * self._max_contextual_seq_len, 1),
-                    dtype=output_seq_timestamps.dtype,
-                    device=output_seq_timestamps.device,
-                ),
-                values_right=output_seq_timestamps.unsqueeze(-1),
+            output_seq_timestamps = concat_1D_jagged(
+                values_left=None,
+                values_right=output_seq_timestamps,
                 max_len_left=self._max_contextual_seq_len,
                 max_len_right=output_max_seq_len,
-                offsets_left=None,
                 offsets_right=output_seq_offsets,
                 kernel=self.hammer_kernel(),
-            ).squeeze(-1)
+            )
             output_max_seq_len = output_max_seq_len + self._max_contextual_seq_len
             output_seq_lengths = output_seq_lengths + self._max_contextual_seq_len
             output_seq_offsets = torch.ops.fbgemm.asynchronous_complete_cumsum(
@@ -237,9 +260,14 @@ class ContextualInterleavePreprocessor(InputPreprocessor):
                 contextual_input_embeddings = get_contextual_input_embeddings(
                     seq_lengths=seq_lengths,
                     seq_payloads=seq_payloads,
-                    contextual_feature_to_max_length=self._contextual_feature_to_max_length,
-                    contextual_feature_to_min_uih_length=self._contextual_feature_to_min_uih_length,
+                    contextual_feature_names=list(
+                        self._contextual_feature_to_max_length.keys()
+                    ),
+                    position_to_feature=self._contextual_position_to_feature,
+                    position_to_index=self._contextual_position_to_index,
+                    min_uih_lengths=self._contextual_position_min_uih_lengths,
                     dtype=seq_embeddings.dtype,
+                    kernel=self.hammer_kernel(),
                 )
                 if isinstance(
                     self._action_embedding_mlp, ParameterizedContextualizedMLP
@@ -251,17 +279,23 @@ class ContextualInterleavePreprocessor(InputPreprocessor):
                         p=self._pmlp_contextual_dropout_ratio,
                         training=self.training,
                     )
-                contextual_embeddings = torch.baddbmm(
-                    self._batched_contextual_linear_bias.to(
+                contextual_embeddings = contextual_linear(
+                    padded_values=contextual_input_embeddings.view(
+                        -1, self._max_contextual_seq_len, self._input_embedding_dim
+                    ),
+                    weights=self._batched_contextual_linear_weights.to(
                         contextual_input_embeddings.dtype
                     ),
-                    contextual_input_embeddings.view(
-                        -1, self._max_contextual_seq_len, self._input_embedding_dim
-                    ).transpose(0, 1),
-                    self._batched_contextual_linear_weights.to(
+                    bias=self._batched_contextual_linear_bias.to(
                         contextual_input_embeddings.dtype
+                    ).view(self._max_contextual_seq_len, self._output_embedding_dim),
+                    kernel=(
+                        HammerKernel.TRITON
+                        if self.is_inference
+                        and self.hammer_kernel() == HammerKernel.TRITON
+                        else HammerKernel.PYTORCH
                     ),
-                ).transpose(0, 1)
+                )
 
             # content embeddings
             seq_offsets = torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths)
@@ -501,6 +501,15 @@ class DlrmHSTU(HammerModule):
             mt_target_weights,
         )
 
+    def prepare_for_inference(self, dtype: Optional[torch.dtype] = None) -> None:
+        """
+        Builds the inference-only caches of the submodules. Call after the
+        checkpoint is loaded and the model is moved to its device.
+        """
+        for module in self.modules():
+            if isinstance(module, ContextualPreprocessor):
+                module.prepare_contextual_linear_cache(dtype)
+
     def forward(
         self,
         uih_features: KeyedJaggedTensor,
@@ -18,18 +18,27 @@
 
 import abc
 from math import sqrt
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import torch
 from generative_recommenders.common import (
-    fx_unwrap_optional_tensor,
+    HammerKernel,
     HammerModule,
     init_mlp_weights_optional_bias,
-    jagged_to_padded_dense,
 )
 from generative_recommenders.modules.action_encoder import ActionEncoder
-from generative_recommenders.ops.jagged_tensors import concat_2D_jagged
-from generative_recommenders.ops.layer_norm import LayerNorm, SwishLayerNorm
+from generative_recommenders.ops.jagged_tensors import (
+    add_scalar_and_cumsum,
+    concat_2D_jagged_multi,
+    contextual_jagged_to_padded_dense,
+    contextual_proj_jagged,
+)
+from generative_recommenders.ops.layer_norm import (
+    LayerNorm,
+    swish_layer_norm_mlp,
+    SwishLayerNorm,
+)
+from torch.fx._symbolic_trace import is_fx_tracing
 
 
 class InputPreprocessor(HammerModule):
@@ -71,30 +80,97 @@ class InputPreprocessor(HammerModule):
         return False
 
 
+def get_contextual_position_info(
+    contextual_feature_to_max_length: Dict[str, int],
+    contextual_feature_to_min_uih_length: Dict[str, int],
+) -> Tuple[torch.Tensor, torch.Tensor, Optional[torch.Tensor]]:
+    """
+    Returns (position_to_feature, position_to_index, min_uih_lengths), each of
+    shape (P,) with P = sum(contextual_feature_to_max_length.values()).
+    min_uih_lengths is None if no feature has a min_uih_length, so the jagged
+    ops skip the seq_lengths check altogether.
+    """
+    position_to_feature: List[int] = []
+    position_to_index: List[int] = []
+    min_uih_lengths: List[int] = []
+    for i, (key, max_len) in enumerate(contextual_feature_to_max_length.items()):
+        position_to_feature.extend([i] * max_len)
+        position_to_index.extend(range(max_len))
+        min_uih_lengths.extend(
+            [contextual_feature_to_min_uih_length.get(key, 0)] * max_len
+        )
+    return (
+        torch.tensor(position_to_feature, dtype=torch.int32),
+        torch.tensor(position_to_index, dtype=torch.int32),
+        (
+            torch.tensor(min_uih_lengths, dtype=torch.int32)
+            if any(length > 0 for length in min_uih_lengths)
+            else None
+        ),
+    )
+
+
+def get_contextual_jagged_values_and_offsets(
+    seq_payloads: Dict[str, torch.Tensor],
+    contextual_feature_names: List[str],
+    dtype: torch.dtype,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Packs the contextual features into a single jagged values buffer of shape
+    (sum_F(sum_B(L_fi)), D), with (F, B + 1) offsets rebased onto that buffer.
+    """
+    values: List[torch.Tensor] = []
+    offsets: List[torch.Tensor] = []
+    base = 0
+    for key in contextual_feature_names:
+        v = seq_payloads[key]
+        values.append(v)
+        offsets.append(seq_payloads[key + "_offsets"] + base)
+        base += v.size(0)
+    if len(values) == 1:
+        return values[0].to(dtype), offsets[0].unsqueeze(0)
+    return torch.cat(values, dim=0).to(dtype), torch.stack(offsets, dim=0)
+
+
 def get_contextual_input_embeddings(
     seq_lengths: torch.Tensor,
     seq_payloads: Dict[str, torch.Tensor],
-    contextual_feature_to_max_length: Dict[str, int],
-    contextual_feature_to_min_uih_length: Dict[str, int],
+    contextual_feature_names: List[str],
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
     dtype: torch.dtype,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
 ) -> torch.Tensor:
-    padded_values: List[torch.Tensor] = []
-    for key, max_len in contextual_feature_to_max_length.items():
-        v = torch.flatten(
-            jagged_to_padded_dense(
-                values=seq_payloads[key].to(dtype),
-                offsets=[seq_payloads[key + "_offsets"]],
-                max_lengths=[max_len],
-                padding_value=0.0,
-            ),
-            1,
-            2,
-        )
-        min_uih_length = contextual_feature_to_min_uih_length.get(key, 0)
-        if min_uih_length > 0:
-            v = v * (seq_lengths.view(-1, 1) >= min_uih_length)
-        padded_values.append(v)
-    return torch.cat(padded_values, dim=1)
+    values, offsets = get_contextual_jagged_values_and_offsets(
+        seq_payloads=seq_payloads,
+        contextual_feature_names=contextual_feature_names,
+        dtype=dtype,
+    )
+    return contextual_jagged_to_padded_dense(
+        values=values,
+        offsets=offsets,
+        seq_lengths=seq_lengths,
+        position_to_feature=position_to_feature,
+        position_to_index=position_to_index,
+        min_uih_lengths=min_uih_lengths,
+        kernel=kernel,
+    ).flatten(1, 2)
+
+
+def get_int8_contextual_weights(
+    weights: torch.Tensor,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Symmetric int8 quantization of (P, Din, Dout) weights with one scale per
+    (position, output channel). Returns int8 weights and (P, Dout) scales.
+    """
+    weights = weights.detach().float()
+    scales = weights.abs().amax(dim=1).clamp(min=1e-8) / 127.0
+    weights_int8 = (
+        torch.round(weights / scales.unsqueeze(1)).clamp(-127, 127).to(torch.int8)
+    )
+    return weights_int8, scales
 
 
 class ContextualPreprocessor(InputPreprocessor):
@@ -108,10 +184,22 @@ class ContextualPreprocessor(InputPreprocessor):
         action_feature_name: str = "",
         action_weights: Optional[List[int]] = None,
         is_inference: bool = True,
+        int8_contextual_weights: bool = False,
+        reuse_concat_buffers: bool = False,
+        compile_forward: bool = False,
     ) -> None:
         super().__init__(is_inference=is_inference)
         self._output_embedding_dim: int = output_embedding_dim
         self._input_embedding_dim: int = input_embedding_dim
+        # inference only: project contextual features with int8 weights
+        self._int8_contextual_weights: bool = int8_contextual_weights
+        # inference only: write the concatenated embeddings and timestamps into
+        # buffers kept across calls. There is one pair of buffers per CUDA
+        # stream, so forwards from threads on their own streams (as in
+        # MultiThreadDataProducer) never share one; outputs are overwritten by
+        # the next call on the same stream.
+        self._reuse_concat_buffers: bool = reuse_concat_buffers
+        self._concat_buffers: Dict[Tuple[torch.device, int], List[torch.Tensor]] = {}
         self._contextual_feature_to_max_length: Dict[str, int] = (
             contextual_feature_to_max_length
         )
@@ -143,8 +231,48 @@ class ContextualPreprocessor(InputPreprocessor):
                     ).fill_(0.0)
                 )
             )
+            (
+                position_to_feature,
+                position_to_index,
+                position_min_uih_lengths,
+            ) = get_contextual_position_info(
+                contextual_feature_to_max_length=contextual_feature_to_max_length,
+                contextual_feature_to_min_uih_length=contextual_feature_to_min_uih_length,
+            )
+            self.register_buffer(
+                "_contextual_position_to_feature",
+                position_to_feature,
+                persistent=False,
+            )
+            self.register_buffer(
+                "_contextual_position_to_index",
+                position_to_index,
+                persistent=False,
+            )
+            self.register_buffer(
+                "_contextual_position_min_uih_lengths",
+                position_min_uih_lengths,
+                persistent=False,
+            )
+            # inference-only copies of the contextual linear params in the
+            # activation dtype (or int8 weights plus their scales), filled by
+            # prepare_contextual_linear_cache so they are not re-cast on every
+            # forward
+            self.register_buffer("_weights_cache", None, persistent=False)
+            self.register_buffer("_weight_scales_cache", None, persistent=False)
+            self.register_buffer("_bias_cache", None, persistent=False)
+            self._register_load_state_dict_pre_hook(
+                self._invalidate_contextual_linear_cache
+            )
+        # (seq_lengths, seq_lengths._version, seq_offsets) of the last call;
+        # holding seq_lengths keeps its storage from being reused.
+        self._cumsum_cache: Optional[Tuple[torch.Tensor, int, torch.Tensor]] = None
+        # inference only: run forward through torch.compile, with CUDA graphs
+        # capturing the chain of small kernels. The seq_offsets cache and the
+        # concat buffers are bypassed while compiling.
+        self._compile_forward: bool = compile_forward
         hidden_dim = 256
-        self._content_embedding_mlp: torch.nn.Module = torch.nn.Sequential(
+        self._content_embedding_mlp: torch.nn.Sequential = torch.nn.Sequential(
             torch.nn.Linear(
                 in_features=self._input_embedding_dim,
                 out_features=hidden_dim,
@@ -165,7 +293,7 @@ class ContextualPreprocessor(InputPreprocessor):
                 action_embedding_dim=action_embedding_dim,
                 is_inference=is_inference,
             )
-            self._action_embedding_mlp: torch.nn.Module = torch.nn.Sequential(
+            self._action_embedding_mlp: torch.nn.Sequential = torch.nn.Sequential(
                 torch.nn.Linear(
                     in_features=self._action_encoder.output_embedding_dim,
                     out_features=hidden_dim,
@@ -178,7 +306,205 @@ class ContextualPreprocessor(InputPreprocessor):
                 LayerNorm(self._output_embedding_dim),
             ).apply(init_mlp_weights_optional_bias)
 
-    def forward(  # noqa C901
+    # pyre-ignore[2]
+    def _invalidate_contextual_linear_cache(self, *args, **kwargs) -> None:
+        self._weights_cache = None
+        self._weight_scales_cache = None
+        self._bias_cache = None
+
+    def prepare_contextual_linear_cache(
+        self, dtype: Optional[torch.dtype] = None
+    ) -> None:
+        """
+        Converts the contextual linear params to dtype (defaults to the params'
+        dtype), or to int8 weights plus scales, once for inference. Call after
+        load_state_dict and set_is_inference(True), before serving: forward only
+        reads the cache, so concurrent forwards never write module state.
+        load_state_dict drops the cache again.
+        """
+        if self._max_contextual_seq_len == 0:
+            return
+        if dtype is None:
+            dtype = self._batched_contextual_linear_bias.dtype
+        with torch.no_grad():
+            if self._int8_contextual_weights:
+                self._weights_cache, self._weight_scales_cache = (
+                    get_int8_contextual_weights(self._batched_contextual_linear_weights)
+                )
+            else:
+                self._weights_cache = self._batched_contextual_linear_weights.to(dtype)
+                self._weight_scales_cache = None
+            self._bias_cache = self._batched_contextual_linear_bias.to(dtype)
+
+    def _contextual_linear_params(
+        self, dtype: torch.dtype
+    ) -> Tuple[torch.Tensor, torch.Tensor, Optional[torch.Tensor]]:
+        """
+        Returns the batched contextual linear weights, bias, and weight scales
+        (None unless the weights are int8). In inference these come from
+        prepare_contextual_linear_cache; float weights only if it was called
+        for dtype.
+        """
+        weights_cache = self._weights_cache
+        bias_cache = self._bias_cache
+        weight_scales_cache = self._weight_scales_cache
+        if self._is_inference and weights_cache is not None and bias_cache is not None:
+            if weight_scales_cache is not None:
+                # int8 weights serve any activation dtype; the bias is tiny
+                return weights_cache, bias_cache.to(dtype), weight_scales_cache
+            if bias_cache.dtype == dtype:
+                return weights_cache, bias_cache, None
+        if self._is_inference and self._int8_contextual_weights:
+            # otherwise traced or compiled graphs would bake in float weights
+            raise RuntimeError(
+                "int8_contextual_weights requires prepare_contextual_linear_cache() "
+                "after load_state_dict"
+            )
+        return (
+            self._batched_contextual_linear_weights.to(dtype),
+            self._batched_contextual_linear_bias.to(dtype),
+            None,
+        )
+
+    @staticmethod
+    def _get_concat_buffer(
+        buf: Optional[torch.Tensor], like: torch.Tensor, num_rows: int
+    ) -> torch.Tensor:
+        if (
+            buf is None
+            or buf.size(0) < num_rows
+            or buf.shape[1:] != like.shape[1:]
+            or buf.dtype != like.dtype
+        ):
+            buf = torch.empty(
+                (num_rows,) + tuple(like.shape[1:]),
+                dtype=like.dtype,
+                device=like.device,
+            )
+        return buf
+
+    def _get_concat_out(
+        self,
+        seq_lengths: torch.Tensor,
+        seq_embeddings: torch.Tensor,
+        seq_timestamps: torch.Tensor,
+    ) -> Optional[List[torch.Tensor]]:
+        """
+        Returns the (embeddings, timestamps) outputs for concat_2D_jagged_multi
+        taken from the current stream's reused buffers, grown as needed, or
+        None to allocate. The buffers are not differentiable, so they are only
+        used with grad disabled.
+        """
+        if (
+            not self._reuse_concat_buffers
+            or not self._is_inference
+            or torch.is_grad_enabled()
+            or is_fx_tracing()
+            or torch.compiler.is_compiling()
+            or seq_embeddings.device.type != "cuda"
+        ):
+            return None
+        device = seq_embeddings.device
+        key = (device, torch.cuda.current_stream(device).cuda_stream)
+        bufs = self._concat_buffers.get(key)
+        B = seq_lengths.size(0)
+        num_rows = B * self._max_contextual_seq_len + seq_embeddings.size(0)
+        emb_buf = self._get_concat_buffer(
+            bufs[0] if bufs is not None else None, seq_embeddings, num_rows
+        )
+        ts_buf = self._get_concat_buffer(
+            bufs[1] if bufs is not None else None, seq_timestamps, num_rows
+        )
+        # each stream only ever writes its own entry
+        self._concat_buffers[key] = [emb_buf, ts_buf]
+        return [emb_buf[:num_rows], ts_buf[:num_rows]]
+
+    def _get_seq_offsets(self, seq_lengths: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the complete cumsum of seq_lengths. In inference the result is
+        reused when called again with the same, unmodified seq_lengths. Tensors
+        created under torch.inference_mode() have no version counter, so they
+        are never cached.
+        """
+        if (
+            not self._is_inference
+            or is_fx_tracing()
+            or torch.compiler.is_compiling()
+            or seq_lengths.is_inference()
+        ):
+            return torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths)
+        cache = self._cumsum_cache
+        if (
+            cache is not None
+            and cache[0].device == seq_lengths.device
+            and cache[0].data_ptr() == seq_lengths.data_ptr()
+            and cache[0].shape == seq_lengths.shape
+            and cache[1] == seq_lengths._version
+        ):
+            return cache[2]
+        seq_offsets = torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths)
+        self._cumsum_cache = (seq_lengths, seq_lengths._version, seq_offsets)
+        return seq_offsets
+
+    def _embedding_mlp(
+        self,
+        mlp: torch.nn.Sequential,
+        x: torch.Tensor,
+        residual: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """
+        Runs Linear -> SwishLayerNorm -> Linear -> LayerNorm, plus residual if
+        given. In inference the Triton path fuses all four ops and the residual
+        add into one kernel over the jagged values.
+        """
+        if not self._is_inference or self.hammer_kernel() != HammerKernel.TRITON:
+            if residual is not None:
+                return residual + mlp(x)
+            return mlp(x)
+        return swish_layer_norm_mlp(
+            x=x,
+            w1=mlp[0].weight,
+            b1=mlp[0].bias,
+            ln1_weight=mlp[1]._weight,
+            ln1_bias=mlp[1]._bias,
+            w2=mlp[2].weight,
+            b2=mlp[2].bias,
+            ln2_weight=mlp[3]._weight,
+            ln2_bias=mlp[3]._bias,
+            eps1=mlp[1]._eps,
+            eps2=mlp[3]._eps,
+            residual=residual,
+            kernel=HammerKernel.TRITON,
+        )
+
+    def _output_seq_embeddings(
+        self,
+        max_seq_len: int,
+        seq_lengths: torch.Tensor,
+        seq_offsets: torch.Tensor,
+        seq_embeddings: torch.Tensor,
+        num_targets: torch.Tensor,
+        seq_payloads: Dict[str, torch.Tensor],
+    ) -> torch.Tensor:
+        output_seq_embeddings = self._embedding_mlp(
+            self._content_embedding_mlp, seq_embeddings
+        )
+        if self._action_weights is not None:
+            action_embeddings = self._action_encoder(
+                max_seq_len=max_seq_len,
+                seq_lengths=seq_lengths,
+                seq_offsets=seq_offsets,
+                seq_payloads=seq_payloads,
+                num_targets=num_targets,
+            )
+            output_seq_embeddings = self._embedding_mlp(
+                self._action_embedding_mlp,
+                action_embeddings,
+                residual=output_seq_embeddings,
+            )
+        return output_seq_embeddings
+
+    def _forward_no_contextual(
         self,
         max_seq_len: int,
         seq_lengths: torch.Tensor,
@@ -195,79 +521,205 @@ class ContextualPreprocessor(InputPreprocessor):
         torch.Tensor,
         Dict[str, torch.Tensor],
     ]:
-        output_seq_embeddings = self._content_embedding_mlp(seq_embeddings)
-        if self._action_weights is not None:
-            action_embeddings = self._action_encoder(
-                seq_lengths=seq_lengths,
-                seq_payloads=seq_payloads,
-            )
-            output_seq_embeddings = output_seq_embeddings + self._action_embedding_mlp(
-                action_embeddings
-            )
+        output_seq_offsets = self._get_seq_offsets(seq_lengths)
+        output_seq_embeddings = self._output_seq_embeddings(
+            max_seq_len=max_seq_len,
+            seq_lengths=seq_lengths,
+            seq_offsets=output_seq_offsets,
+            seq_embeddings=seq_embeddings,
+            num_targets=num_targets,
+            seq_payloads=seq_payloads,
+        )
+        return (
+            max_seq_len,
+            seq_lengths,
+            output_seq_offsets,
+            seq_timestamps,
+            output_seq_embeddings,
+            num_targets,
+            seq_payloads,
+        )
 
-        output_max_seq_len = max_seq_len
-        output_seq_lengths = seq_lengths
-        output_num_targets = num_targets
-        output_seq_timestamps = seq_timestamps
-        output_seq_offsets = torch.ops.fbgemm.asynchronous_complete_cumsum(
-            output_seq_lengths
+    def _forward_with_contextual(
+        self,
+        max_seq_len: int,
+        seq_lengths: torch.Tensor,
+        seq_timestamps: torch.Tensor,
+        seq_embeddings: torch.Tensor,
+        num_targets: torch.Tensor,
+        seq_payloads: Dict[str, torch.Tensor],
+    ) -> Tuple[
+        int,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        Dict[str, torch.Tensor],
+    ]:
+        output_seq_offsets = self._get_seq_offsets(seq_lengths)
+        output_seq_embeddings = self._output_seq_embeddings(
+            max_seq_len=max_seq_len,
+            seq_lengths=seq_lengths,
+            seq_offsets=output_seq_offsets,
+            seq_embeddings=seq_embeddings,
+            num_targets=num_targets,
+            seq_payloads=seq_payloads,
         )
         # concat contextual embeddings
-        if self._max_contextual_seq_len > 0:
-            contextual_input_embeddings = get_contextual_input_embeddings(
-                seq_lengths=seq_lengths,
+        contextual_values, contextual_offsets = (
+            get_contextual_jagged_values_and_offsets(
                 seq_payloads=seq_payloads,
-                contextual_feature_to_max_length=self._contextual_feature_to_max_length,
-                contextual_feature_to_min_uih_length=self._contextual_feature_to_min_uih_length,
-                dtype=seq_embeddings.dtype,
-            )
-            contextual_embeddings = torch.baddbmm(
-                self._batched_contextual_linear_bias.to(
-                    contextual_input_embeddings.dtype
-                ),
-                contextual_input_embeddings.view(
-                    -1, self._max_contextual_seq_len, self._input_embedding_dim
-                ).transpose(0, 1),
-                self._batched_contextual_linear_weights.to(
-                    contextual_input_embeddings.dtype
+                contextual_feature_names=list(
+                    self._contextual_feature_to_max_length.keys()
                 ),
-            ).transpose(0, 1)
-            output_seq_embeddings = concat_2D_jagged(
-                values_left=fx_unwrap_optional_tensor(contextual_embeddings).reshape(
-                    -1, self._output_embedding_dim
-                ),
-                values_right=output_seq_embeddings,
-                max_len_left=self._max_contextual_seq_len,
-                max_len_right=output_max_seq_len,
-                offsets_left=None,
-                offsets_right=output_seq_offsets,
-                kernel=self.hammer_kernel(),
-            )
-            output_seq_timestamps = concat_2D_jagged(
-                values_left=torch.zeros(
-                    (output_seq_lengths.size(0) * self._max_contextual_seq_len, 1),
-                    dtype=output_seq_timestamps.dtype,
-                    device=output_seq_timestamps.device,
-                ),
-                values_right=output_seq_timestamps.unsqueeze(-1),
-                max_len_left=self._max_contextual_seq_len,
-                max_len_right=output_max_seq_len,
-                offsets_left=None,
-                offsets_right=output_seq_offsets,
-                kernel=self.hammer_kernel(),
-            ).squeeze(-1)
-            output_max_seq_len = output_max_seq_len + self._max_contextual_seq_len
-            output_seq_lengths = output_seq_lengths + self._max_contextual_seq_len
-            output_seq_offsets = torch.ops.fbgemm.asynchronous_complete_cumsum(
-                output_seq_lengths
+                dtype=seq_embeddings.dtype,
             )
-
+        )
+        contextual_weights, contextual_bias, contextual_weight_scales = (
+            self._contextual_linear_params(contextual_values.dtype)
+        )
+        contextual_embeddings = contextual_proj_jagged(
+            values=contextual_values,
+            offsets=contextual_offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=self._contextual_position_to_feature,
+            position_to_index=self._contextual_position_to_index,
+            min_uih_lengths=self._contextual_position_min_uih_lengths,
+            weights=contextual_weights,
+            bias=contextual_bias,
+            weight_scales=contextual_weight_scales,
+            kernel=self.hammer_kernel(),
+        )
+        output_seq_embeddings, output_seq_timestamps = concat_2D_jagged_multi(
+            values_left=[
+                contextual_embeddings.reshape(-1, self._output_embedding_dim),
+                None,
+            ],
+            values_right=[
+                output_seq_embeddings,
+                seq_timestamps.unsqueeze(-1),
+            ],
+            max_len_left=self._max_contextual_seq_len,
+            max_len_right=max_seq_len,
+            offsets_right=output_seq_offsets,
+            out=self._get_concat_out(
+                seq_lengths=seq_lengths,
+                seq_embeddings=output_seq_embeddings,
+                seq_timestamps=seq_timestamps.unsqueeze(-1),
+            ),
+            kernel=self.hammer_kernel(),
+        )
+        output_seq_lengths, output_seq_offsets = add_scalar_and_cumsum(
+            lengths=seq_lengths,
+            scalar=self._max_contextual_seq_len,
+            kernel=self.hammer_kernel(),
+        )
         return (
-            output_max_seq_len,
+            max_seq_len + self._max_contextual_seq_len,
             output_seq_lengths,
             output_seq_offsets,
-            output_seq_timestamps,
+            output_seq_timestamps.squeeze(-1),
             output_seq_embeddings,
-            output_num_targets,
+            num_targets,
             seq_payloads,
         )
+
+    def _forward_impl(
+        self,
+        max_seq_len: int,
+        seq_lengths: torch.Tensor,
+        seq_timestamps: torch.Tensor,
+        seq_embeddings: torch.Tensor,
+        num_targets: torch.Tensor,
+        seq_payloads: Dict[str, torch.Tensor],
+    ) -> Tuple[
+        int,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        Dict[str, torch.Tensor],
+    ]:
+        # _max_contextual_seq_len is fixed at init, so tracing and compilation
+        # only ever see one of the two specialized paths.
+        if self._max_contextual_seq_len == 0:
+            return self._forward_no_contextual(
+                max_seq_len=max_seq_len,
+                seq_lengths=seq_lengths,
+                seq_timestamps=seq_timestamps,
+                seq_embeddings=seq_embeddings,
+                num_targets=num_targets,
+                seq_payloads=seq_payloads,
+            )
+        return self._forward_with_contextual(
+            max_seq_len=max_seq_len,
+            seq_lengths=seq_lengths,
+            seq_timestamps=seq_timestamps,
+            seq_embeddings=seq_embeddings,
+            num_targets=num_targets,
+            seq_payloads=seq_payloads,
+        )
+
+    def forward(
+        self,
+        max_seq_len: int,
+        seq_lengths: torch.Tensor,
+        seq_timestamps: torch.Tensor,
+        seq_embeddings: torch.Tensor,
+        num_targets: torch.Tensor,
+        seq_payloads: Dict[str, torch.Tensor],
+    ) -> Tuple[
+        int,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        torch.Tensor,
+        Dict[str, torch.Tensor],
+    ]:
+        if (
+            self._compile_forward
+            and self._is_inference
+            and not is_fx_tracing()
+            and not torch.compiler.is_compiling()
+        ):
+            return _get_compiled_forward_impl()(
+                self,
+                max_seq_len=max_seq_len,
+                seq_lengths=seq_lengths,
+                seq_timestamps=seq_timestamps,
+                seq_embeddings=seq_embeddings,
+                num_targets=num_targets,
+                seq_payloads=seq_payloads,
+            )
+        return self._forward_impl(
+            max_seq_len=max_seq_len,
+            seq_lengths=seq_lengths,
+            seq_timestamps=seq_timestamps,
+            seq_embeddings=seq_embeddings,
+            num_targets=num_targets,
+            seq_payloads=seq_payloads,
+        )
+
+
+# pyre-ignore[24]
+_compiled_forward_impl: Optional[Callable] = None
+
+
+# pyre-ignore[24]
+def _get_compiled_forward_impl() -> Callable:
+    """
+    Compiles the unbound ContextualPreprocessor._forward_impl on first use, so
+    modules hold no compiled callable and still deepcopy and pickle.
+    """
+    global _compiled_forward_impl
+    if _compiled_forward_impl is None:
+        _compiled_forward_impl = torch.compile(
+            ContextualPreprocessor._forward_impl,
+            dynamic=True,
+            mode="reduce-overhead",
+            fullgraph=False,
+        )
+    return _compiled_forward_impl
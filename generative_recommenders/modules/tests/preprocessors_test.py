@@ -0,0 +1,506 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python3
+
+# pyre-strict
+
+import copy
+import pickle
+import unittest
+from typing import Any, Dict, List, Tuple
+
+import torch
+from generative_recommenders.common import (
+    gpu_unavailable,
+    HammerKernel,
+    jagged_to_padded_dense,
+)
+from generative_recommenders.modules.preprocessors import ContextualPreprocessor
+from hypothesis import given, settings, strategies as st, Verbosity
+
+
+def _get_inputs(
+    batch_size: int,
+    max_seq_len: int,
+    input_embedding_dim: int,
+    contextual_feature_to_max_length: Dict[str, int],
+    device: torch.device,
+) -> Dict[str, Any]:
+    seq_lengths = torch.randint(1, max_seq_len + 1, (batch_size,), device=device)
+    num_targets = torch.randint(0, 2, (batch_size,), device=device)
+    total_seq_len = int(seq_lengths.sum().item())
+    seq_payloads = {
+        "actions": torch.randint(0, 32, (total_seq_len,), device=device),
+    }
+    for key, max_len in contextual_feature_to_max_length.items():
+        lengths = torch.randint(0, max_len + 1, (batch_size,), device=device)
+        seq_payloads[key] = torch.rand(
+            (int(lengths.sum().item()), input_embedding_dim), device=device
+        ).requires_grad_(True)
+        seq_payloads[key + "_offsets"] = torch.ops.fbgemm.asynchronous_complete_cumsum(
+            lengths
+        )
+    return {
+        "max_seq_len": max_seq_len,
+        "seq_lengths": seq_lengths,
+        "seq_timestamps": torch.randint(0, 1000000, (total_seq_len,), device=device),
+        "seq_embeddings": torch.rand(
+            (total_seq_len, input_embedding_dim), device=device
+        ).requires_grad_(True),
+        "num_targets": num_targets,
+        "seq_payloads": seq_payloads,
+    }
+
+
+def _reference_forward(
+    preprocessor: ContextualPreprocessor,
+    contextual_feature_to_max_length: Dict[str, int],
+    contextual_feature_to_min_uih_length: Dict[str, int],
+    max_seq_len: int,
+    seq_lengths: torch.Tensor,
+    seq_timestamps: torch.Tensor,
+    seq_embeddings: torch.Tensor,
+    num_targets: torch.Tensor,
+    seq_payloads: Dict[str, torch.Tensor],
+) -> Tuple[int, torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Padded dense reference: jagged_to_padded_dense and baddbmm for the
+    contextual projection, then a per-sequence concat.
+    """
+    seq_offsets = torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths)
+    seq_embeddings = preprocessor._content_embedding_mlp(seq_embeddings)
+    if preprocessor._action_weights is not None:
+        seq_embeddings = seq_embeddings + preprocessor._action_embedding_mlp(
+            preprocessor._action_encoder(
+                max_seq_len=max_seq_len,
+                seq_lengths=seq_lengths,
+                seq_offsets=seq_offsets,
+                seq_payloads=seq_payloads,
+                num_targets=num_targets,
+            )
+        )
+    contextual_len = sum(contextual_feature_to_max_length.values())
+    if contextual_len == 0:
+        return max_seq_len, seq_lengths, seq_timestamps, seq_embeddings
+
+    padded_values: List[torch.Tensor] = []
+    for key, max_len in contextual_feature_to_max_length.items():
+        v = torch.flatten(
+            jagged_to_padded_dense(
+                values=seq_payloads[key],
+                offsets=[seq_payloads[key + "_offsets"]],
+                max_lengths=[max_len],
+                padding_value=0.0,
+            ),
+            1,
+            2,
+        )
+        min_uih_length = contextual_feature_to_min_uih_length.get(key, 0)
+        if min_uih_length > 0:
+            v = v * (seq_lengths.view(-1, 1) >= min_uih_length)
+        padded_values.append(v)
+    contextual_embeddings = torch.baddbmm(
+        preprocessor._batched_contextual_linear_bias.unsqueeze(1),
+        torch.cat(padded_values, dim=1)
+        .view(-1, contextual_len, preprocessor._input_embedding_dim)
+        .transpose(0, 1),
+        preprocessor._batched_contextual_linear_weights,
+    ).transpose(0, 1)
+    output_embeddings: List[torch.Tensor] = []
+    output_timestamps: List[torch.Tensor] = []
+    for b in range(seq_lengths.size(0)):
+        start = int(seq_offsets[b].item())
+        end = int(seq_offsets[b + 1].item())
+        output_embeddings.append(contextual_embeddings[b])
+        output_embeddings.append(seq_embeddings[start:end])
+        output_timestamps.append(torch.zeros_like(seq_timestamps[:contextual_len]))
+        output_timestamps.append(seq_timestamps[start:end])
+    return (
+        max_seq_len + contextual_len,
+        seq_lengths + contextual_len,
+        torch.cat(output_timestamps),
+        torch.cat(output_embeddings),
+    )
+
+
+class ContextualPreprocessorTest(unittest.TestCase):
+    # pyre-ignore
+    @given(
+        has_contextual=st.sampled_from([True, False]),
+        has_min_uih_length=st.sampled_from([True, False]),
+        has_action_weights=st.sampled_from([True, False]),
+        batch_size=st.integers(1, 8),
+        max_seq_len=st.integers(1, 40),
+        kernel=st.sampled_from([HammerKernel.PYTORCH, HammerKernel.TRITON]),
+    )
+    @unittest.skipIf(*gpu_unavailable)
+    @settings(verbosity=Verbosity.verbose, max_examples=50, deadline=None)
+    def test_forward(
+        self,
+        has_contextual: bool,
+        has_min_uih_length: bool,
+        has_action_weights: bool,
+        batch_size: int,
+        max_seq_len: int,
+        kernel: HammerKernel,
+    ) -> None:
+        device = torch.device("cuda")
+        input_embedding_dim = 64
+        output_embedding_dim = 32
+        contextual_feature_to_max_length = (
+            {"c_0": 1, "c_1": 2} if has_contextual else {}
+        )
+        contextual_feature_to_min_uih_length = (
+            {"c_1": 4} if has_contextual and has_min_uih_length else {}
+        )
+        preprocessor = ContextualPreprocessor(
+            input_embedding_dim=input_embedding_dim,
+            output_embedding_dim=output_embedding_dim,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            contextual_feature_to_min_uih_length=contextual_feature_to_min_uih_length,
+            action_embedding_dim=8,
+            action_feature_name="actions",
+            action_weights=[1, 2, 4, 8, 16] if has_action_weights else None,
+            is_inference=False,
+        ).to(device)
+        preprocessor.set_hammer_kernel(kernel)
+
+        inputs = _get_inputs(
+            batch_size=batch_size,
+            max_seq_len=max_seq_len,
+            input_embedding_dim=input_embedding_dim,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            device=device,
+        )
+        (
+            output_max_seq_len,
+            output_seq_lengths,
+            output_seq_offsets,
+            output_seq_timestamps,
+            output_seq_embeddings,
+            output_num_targets,
+            _,
+        ) = preprocessor(**inputs)
+        (
+            ref_max_seq_len,
+            ref_seq_lengths,
+            ref_seq_timestamps,
+            ref_seq_embeddings,
+        ) = _reference_forward(
+            preprocessor,
+            contextual_feature_to_max_length,
+            contextual_feature_to_min_uih_length,
+            **inputs,
+        )
+        self.assertEqual(output_max_seq_len, ref_max_seq_len)
+        self.assertEqual(output_seq_lengths.tolist(), ref_seq_lengths.tolist())
+        torch.testing.assert_close(
+            output_seq_offsets,
+            torch.ops.fbgemm.asynchronous_complete_cumsum(ref_seq_lengths),
+        )
+        self.assertEqual(output_seq_timestamps.tolist(), ref_seq_timestamps.tolist())
+        self.assertEqual(output_num_targets.tolist(), inputs["num_targets"].tolist())
+        torch.testing.assert_close(output_seq_embeddings, ref_seq_embeddings)
+
+        # backward
+        grad_inputs = [inputs["seq_embeddings"]] + [
+            inputs["seq_payloads"][key] for key in contextual_feature_to_max_length
+        ]
+        grad_inputs += [p for p in preprocessor.parameters() if p.requires_grad]
+        dout = torch.randn_like(ref_seq_embeddings)
+        grads = torch.autograd.grad(
+            output_seq_embeddings, grad_inputs, dout, allow_unused=True
+        )
+        ref_grads = torch.autograd.grad(
+            ref_seq_embeddings, grad_inputs, dout, allow_unused=True
+        )
+        for grad, ref_grad in zip(grads, ref_grads):
+            if ref_grad is None:
+                self.assertIsNone(grad)
+            else:
+                torch.testing.assert_close(grad, ref_grad)
+
+    @unittest.skipIf(*gpu_unavailable)
+    def test_seq_offsets_cache(self) -> None:
+        device = torch.device("cuda")
+        preprocessor = ContextualPreprocessor(
+            input_embedding_dim=64,
+            output_embedding_dim=32,
+            contextual_feature_to_max_length={},
+            contextual_feature_to_min_uih_length={},
+            is_inference=True,
+        ).to(device)
+        inputs = _get_inputs(
+            batch_size=4,
+            max_seq_len=10,
+            input_embedding_dim=64,
+            contextual_feature_to_max_length={},
+            device=device,
+        )
+        seq_lengths = inputs["seq_lengths"]
+        with torch.no_grad():
+            _, _, seq_offsets, _, _, _, _ = preprocessor(**inputs)
+            _, _, cached_seq_offsets, _, _, _, _ = preprocessor(**inputs)
+            self.assertIs(cached_seq_offsets, seq_offsets)
+            torch.testing.assert_close(
+                seq_offsets, torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths)
+            )
+
+            # an in-place edit of seq_lengths invalidates the cached offsets
+            seq_lengths.copy_(seq_lengths.flip(0))
+            _, _, new_seq_offsets, _, _, _, _ = preprocessor(**inputs)
+            self.assertIsNot(new_seq_offsets, seq_offsets)
+            torch.testing.assert_close(
+                new_seq_offsets,
+                torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths),
+            )
+
+    # pyre-ignore
+    @given(
+        has_contextual=st.sampled_from([True, False]),
+        kernel=st.sampled_from([HammerKernel.PYTORCH, HammerKernel.TRITON]),
+    )
+    @unittest.skipIf(*gpu_unavailable)
+    @settings(verbosity=Verbosity.verbose, max_examples=8, deadline=None)
+    def test_inference_mode(self, has_contextual: bool, kernel: HammerKernel) -> None:
+        device = torch.device("cuda")
+        contextual_feature_to_max_length = (
+            {"c_0": 1, "c_1": 2} if has_contextual else {}
+        )
+        preprocessor = ContextualPreprocessor(
+            input_embedding_dim=64,
+            output_embedding_dim=32,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            contextual_feature_to_min_uih_length={"c_1": 4} if has_contextual else {},
+            is_inference=True,
+        ).to(device)
+        preprocessor.set_hammer_kernel(kernel)
+        with torch.inference_mode():
+            # seq_lengths is an inference tensor, which has no version counter
+            inputs = _get_inputs(
+                batch_size=4,
+                max_seq_len=10,
+                input_embedding_dim=64,
+                contextual_feature_to_max_length=contextual_feature_to_max_length,
+                device=device,
+            )
+            for _ in range(2):
+                _, seq_lengths, seq_offsets, _, _, _, _ = preprocessor(**inputs)
+                torch.testing.assert_close(
+                    seq_offsets,
+                    torch.ops.fbgemm.asynchronous_complete_cumsum(seq_lengths),
+                )
+
+    # pyre-ignore
+    @given(
+        kernel=st.sampled_from([HammerKernel.PYTORCH, HammerKernel.TRITON]),
+    )
+    @unittest.skipIf(*gpu_unavailable)
+    @settings(verbosity=Verbosity.verbose, max_examples=4, deadline=None)
+    def test_reuse_concat_buffers(self, kernel: HammerKernel) -> None:
+        device = torch.device("cuda")
+        contextual_feature_to_max_length = {"c_0": 1, "c_1": 2}
+        kwargs: Dict[str, Any] = {
+            "input_embedding_dim": 64,
+            "output_embedding_dim": 32,
+            "contextual_feature_to_max_length": contextual_feature_to_max_length,
+            "contextual_feature_to_min_uih_length": {"c_1": 4},
+            "is_inference": True,
+        }
+        ref_preprocessor = ContextualPreprocessor(**kwargs).to(device)
+        preprocessor = ContextualPreprocessor(
+            reuse_concat_buffers=True,
+            **kwargs,
+        ).to(device)
+        preprocessor.load_state_dict(ref_preprocessor.state_dict())
+        ref_preprocessor.set_hammer_kernel(kernel)
+        preprocessor.set_hammer_kernel(kernel)
+
+        data_ptr = None
+        for batch_size in [8, 3]:
+            inputs = _get_inputs(
+                batch_size=batch_size,
+                max_seq_len=20,
+                input_embedding_dim=64,
+                contextual_feature_to_max_length=contextual_feature_to_max_length,
+                device=device,
+            )
+            with torch.no_grad():
+                _, _, _, ref_timestamps, ref_embeddings, _, _ = ref_preprocessor(
+                    **inputs
+                )
+                _, _, _, timestamps, embeddings, _, _ = preprocessor(**inputs)
+            torch.testing.assert_close(embeddings, ref_embeddings)
+            self.assertEqual(timestamps.tolist(), ref_timestamps.tolist())
+            # the second, smaller batch is written into the same buffer
+            if data_ptr is not None:
+                self.assertEqual(embeddings.data_ptr(), data_ptr)
+            data_ptr = embeddings.data_ptr()
+
+        with torch.no_grad():
+            # another stream gets its own buffers
+            stream = torch.cuda.Stream()
+            with torch.cuda.stream(stream):
+                _, _, _, _, embeddings, _, _ = preprocessor(**inputs)
+            torch.cuda.current_stream().wait_stream(stream)
+            self.assertNotEqual(embeddings.data_ptr(), data_ptr)
+            torch.testing.assert_close(embeddings, ref_embeddings)
+        # with grad enabled the output is never a reused buffer
+        _, _, _, _, embeddings, _, _ = preprocessor(**inputs)
+        self.assertNotEqual(embeddings.data_ptr(), data_ptr)
+        torch.testing.assert_close(embeddings, ref_embeddings)
+
+    @unittest.skipIf(*gpu_unavailable)
+    def test_contextual_linear_cache(self) -> None:
+        device = torch.device("cuda")
+        contextual_feature_to_max_length = {"c_0": 1, "c_1": 2}
+        preprocessor = ContextualPreprocessor(
+            input_embedding_dim=64,
+            output_embedding_dim=32,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            contextual_feature_to_min_uih_length={},
+            is_inference=True,
+        ).to(device)
+        inputs = _get_inputs(
+            batch_size=4,
+            max_seq_len=10,
+            input_embedding_dim=64,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            device=device,
+        )
+        with torch.no_grad():
+            _, _, _, _, ref_embeddings, _, _ = preprocessor(**inputs)
+            self.assertIsNone(preprocessor._weights_cache)
+
+            preprocessor.prepare_contextual_linear_cache()
+            self.assertIsNotNone(preprocessor._weights_cache)
+            self.assertIsNotNone(preprocessor._bias_cache)
+            _, _, _, _, embeddings, _, _ = preprocessor(**inputs)
+            torch.testing.assert_close(embeddings, ref_embeddings)
+
+            # load_state_dict drops the cache, so new weights are picked up
+            state_dict = preprocessor.state_dict()
+            state_dict["_batched_contextual_linear_bias"] = (
+                state_dict["_batched_contextual_linear_bias"] + 1.0
+            )
+            preprocessor.load_state_dict(state_dict)
+            self.assertIsNone(preprocessor._weights_cache)
+            self.assertIsNone(preprocessor._bias_cache)
+            _, _, _, _, embeddings, _, _ = preprocessor(**inputs)
+            self.assertFalse(torch.allclose(embeddings, ref_embeddings))
+
+    # pyre-ignore
+    @given(
+        kernel=st.sampled_from([HammerKernel.PYTORCH, HammerKernel.TRITON]),
+    )
+    @unittest.skipIf(*gpu_unavailable)
+    @settings(verbosity=Verbosity.verbose, max_examples=4, deadline=None)
+    def test_int8_contextual_weights(self, kernel: HammerKernel) -> None:
+        device = torch.device("cuda")
+        contextual_feature_to_max_length = {"c_0": 1, "c_1": 2}
+        kwargs: Dict[str, Any] = {
+            "input_embedding_dim": 64,
+            "output_embedding_dim": 32,
+            "contextual_feature_to_max_length": contextual_feature_to_max_length,
+            "contextual_feature_to_min_uih_length": {"c_1": 4},
+            "is_inference": True,
+        }
+        ref_preprocessor = ContextualPreprocessor(**kwargs).to(device)
+        preprocessor = ContextualPreprocessor(
+            int8_contextual_weights=True,
+            **kwargs,
+        ).to(device)
+        preprocessor.load_state_dict(ref_preprocessor.state_dict())
+        ref_preprocessor.set_hammer_kernel(kernel)
+        preprocessor.set_hammer_kernel(kernel)
+        inputs = _get_inputs(
+            batch_size=4,
+            max_seq_len=10,
+            input_embedding_dim=64,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            device=device,
+        )
+        with torch.no_grad():
+            # int8 weights are never silently replaced by float ones
+            with self.assertRaises(RuntimeError):
+                preprocessor(**inputs)
+
+            preprocessor.prepare_contextual_linear_cache(torch.float32)
+            weights_cache = preprocessor._weights_cache
+            assert weights_cache is not None
+            self.assertEqual(weights_cache.dtype, torch.int8)
+            _, _, _, _, ref_embeddings, _, _ = ref_preprocessor(**inputs)
+            _, _, _, _, embeddings, _, _ = preprocessor(**inputs)
+        torch.testing.assert_close(embeddings, ref_embeddings, atol=2e-2, rtol=2e-2)
+
+    def test_compile_forward_copy(self) -> None:
+        preprocessor = ContextualPreprocessor(
+            input_embedding_dim=64,
+            output_embedding_dim=32,
+            contextual_feature_to_max_length={"c_0": 1, "c_1": 2},
+            contextual_feature_to_min_uih_length={},
+            is_inference=True,
+            compile_forward=True,
+        )
+        # compilation is deferred to forward, so the module holds no compiled
+        # callable
+        copied = copy.deepcopy(preprocessor)
+        self.assertTrue(copied._compile_forward)
+        unpickled = pickle.loads(pickle.dumps(preprocessor))
+        self.assertTrue(unpickled._compile_forward)
+
+    # pyre-ignore
+    @given(
+        has_contextual=st.sampled_from([True, False]),
+        kernel=st.sampled_from([HammerKernel.PYTORCH, HammerKernel.TRITON]),
+    )
+    @unittest.skipIf(*gpu_unavailable)
+    @settings(verbosity=Verbosity.verbose, max_examples=4, deadline=None)
+    def test_compile_forward(self, has_contextual: bool, kernel: HammerKernel) -> None:
+        torch._dynamo.reset()
+        device = torch.device("cuda")
+        contextual_feature_to_max_length = (
+            {"c_0": 1, "c_1": 2} if has_contextual else {}
+        )
+        preprocessor = ContextualPreprocessor(
+            input_embedding_dim=64,
+            output_embedding_dim=32,
+            contextual_feature_to_max_length=contextual_feature_to_max_length,
+            contextual_feature_to_min_uih_length={"c_1": 4} if has_contextual else {},
+            is_inference=True,
+            compile_forward=True,
+        ).to(device)
+        preprocessor.set_hammer_kernel(kernel)
+        preprocessor.prepare_contextual_linear_cache()
+        # two batch shapes, each run twice so the second call replays the
+        # captured graph
+        for batch_size in [8, 3, 8, 3]:
+            inputs = _get_inputs(
+                batch_size=batch_size,
+                max_seq_len=20,
+                input_embedding_dim=64,
+                contextual_feature_to_max_length=contextual_feature_to_max_length,
+                device=device,
+            )
+            with torch.no_grad():
+                # CUDA graph outputs are overwritten by the next replay
+                outputs = [
+                    x.clone() if isinstance(x, torch.Tensor) else x
+                    for x in preprocessor(**inputs)[:6]
+                ]
+                ref_outputs = preprocessor._forward_impl(**inputs)[:6]
+            self.assertEqual(outputs[0], ref_outputs[0])
+            for output, ref_output in zip(outputs[1:], ref_outputs[1:]):
+                torch.testing.assert_close(output, ref_output)
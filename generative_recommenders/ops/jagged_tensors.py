@@ -16,7 +16,7 @@
 
 # pyre-strict
 
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import torch
 
@@ -25,7 +25,13 @@ from generative_recommenders.ops.pytorch.pt_jagged import (
     pytorch_jagged_dense_bmm_broadcast_add,
 )
 from generative_recommenders.ops.pytorch.pt_jagged_tensors import (
+    pytorch_add_scalar_and_cumsum,
+    pytorch_concat_1D_jagged,
     pytorch_concat_2D_jagged,
+    pytorch_concat_2D_jagged_with_zero_left,
+    pytorch_contextual_jagged_to_padded_dense,
+    pytorch_contextual_linear,
+    pytorch_contextual_proj_jagged,
     pytorch_hstu_concat_l2_embeddings,
     pytorch_hstu_split_l2_embeddings,
     pytorch_split_2D_jagged,
@@ -35,7 +41,13 @@ from generative_recommenders.ops.triton.triton_jagged import (
     triton_jagged_dense_bmm_broadcast_add,
 )
 from generative_recommenders.ops.triton.triton_jagged_tensors import (
+    triton_add_scalar_and_cumsum,
+    triton_concat_1D_jagged,
     triton_concat_2D_jagged,
+    triton_concat_2D_jagged_multi,
+    triton_contextual_jagged_to_padded_dense,
+    triton_contextual_linear_fwd,
+    triton_contextual_proj_jagged,
     triton_split_2D_jagged,
 )
 from torch.fx._symbolic_trace import is_fx_tracing
@@ -48,8 +60,14 @@ except ImportError:
     pass
 
 
+torch.fx.wrap("triton_add_scalar_and_cumsum")
+torch.fx.wrap("triton_concat_1D_jagged")
 torch.fx.wrap("triton_concat_2D_jagged")
+torch.fx.wrap("triton_concat_2D_jagged_multi")
 torch.fx.wrap("triton_split_2D_jagged")
+torch.fx.wrap("triton_contextual_jagged_to_padded_dense")
+torch.fx.wrap("triton_contextual_linear_fwd")
+torch.fx.wrap("triton_contextual_proj_jagged")
 
 
 def concat_2D_jagged(
@@ -88,6 +106,105 @@ def concat_2D_jagged(
         )
 
 
+def concat_1D_jagged(
+    values_left: Optional[torch.Tensor],
+    values_right: torch.Tensor,
+    max_len_left: int,
+    max_len_right: int,
+    offsets_right: torch.Tensor,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> torch.Tensor:
+    """
+    Concats 1D values_left and values_right along the jagged dim, e.g. for
+    timestamps. values_left is dense with max_len_left values per sequence,
+    and None is treated as zeros.
+    """
+    if not is_fx_tracing():
+        torch._assert(values_right.dim() == 1, "values_right must be 1D")
+        if values_left is not None:
+            torch._assert(values_left.dim() == 1, "values_left must be 1D")
+    if kernel == HammerKernel.TRITON:
+        return triton_concat_1D_jagged(
+            values_left=values_left,
+            values_right=values_right,
+            max_len_left=max_len_left,
+            max_len_right=max_len_right,
+            offsets_right=offsets_right,
+        )
+    else:
+        return pytorch_concat_1D_jagged(
+            values_left=values_left,
+            values_right=values_right,
+            max_len_left=max_len_left,
+            max_len_right=max_len_right,
+            offsets_right=offsets_right,
+        )
+
+
+def concat_2D_jagged_multi(
+    values_left: List[Optional[torch.Tensor]],
+    values_right: List[torch.Tensor],
+    max_len_left: int,
+    max_len_right: int,
+    offsets_right: Optional[torch.Tensor],
+    out: Optional[List[torch.Tensor]] = None,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> List[torch.Tensor]:
+    """
+    Concats each values_left[i] with values_right[i] along the jagged dim.
+    All pairs share the same lengths, so the Triton kernel computes the
+    destination rows once for every pair. values_left are dense with
+    max_len_left rows per sequence, and a None entry is treated as zeros.
+    If out is given, the i-th result is written into out[i] and returned
+    (inference only, out is not differentiable).
+    """
+    if not is_fx_tracing():
+        torch._assert(len(values_right) > 0, "values_right must not be empty")
+        torch._assert(
+            len(values_left) == len(values_right),
+            "values_left and values_right must have the same length",
+        )
+        if out is not None:
+            torch._assert(
+                len(out) == len(values_right),
+                "out and values_right must have the same length",
+            )
+    if kernel == HammerKernel.TRITON:
+        return triton_concat_2D_jagged_multi(
+            values_left=values_left,
+            values_right=values_right,
+            max_len_left=max_len_left,
+            max_len_right=max_len_right,
+            offsets_right=offsets_right,
+            out=out,
+        )
+    outputs: List[torch.Tensor] = []
+    for left, right in zip(values_left, values_right):
+        if left is None:
+            outputs.append(
+                pytorch_concat_2D_jagged_with_zero_left(
+                    max_len_left=max_len_left,
+                    values_right=right,
+                    max_len_right=max_len_right,
+                    offsets_right=offsets_right,
+                )
+            )
+        else:
+            outputs.append(
+                pytorch_concat_2D_jagged(
+                    values_left=left,
+                    values_right=right,
+                    max_len_left=max_len_left,
+                    max_len_right=max_len_right,
+                    offsets_left=None,
+                    offsets_right=offsets_right,
+                )
+            )
+    if out is not None:
+        return [o.copy_(v) for o, v in zip(out, outputs)]
+    return outputs
+
+
 def split_2D_jagged(
     max_seq_len: int,
     values: torch.Tensor,
@@ -242,3 +359,163 @@ def jagged_dense_bmm_broadcast_add(
             dense=dense,
             bias=bias,
         )
+
+
+def contextual_jagged_to_padded_dense(
+    values: torch.Tensor,
+    offsets: torch.Tensor,
+    seq_lengths: torch.Tensor,
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> torch.Tensor:
+    """
+    Pads F jagged contextual features into a single (B, P, K) dense tensor with
+    one gather, where out[b, p] is defined as in contextual_proj_jagged.
+    """
+    if not is_fx_tracing():
+        P = position_to_feature.shape[0]
+        torch._assert(values.dim() == 2, "values must be 2D")
+        torch._assert(offsets.dim() == 2, "offsets must be 2D")
+        torch._assert(
+            offsets.shape[1] == seq_lengths.shape[0] + 1, "wrong offsets shape[1]"
+        )
+        torch._assert(position_to_index.shape[0] == P, "wrong position_to_index")
+        if min_uih_lengths is not None:
+            torch._assert(min_uih_lengths.shape[0] == P, "wrong min_uih_lengths")
+    if kernel == HammerKernel.TRITON:
+        return triton_contextual_jagged_to_padded_dense(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+        )
+    else:
+        return pytorch_contextual_jagged_to_padded_dense(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+        )
+
+
+def contextual_linear(
+    padded_values: torch.Tensor,
+    weights: torch.Tensor,
+    bias: torch.Tensor,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> torch.Tensor:
+    """
+    Computing out[b, p] = padded_values[b, p] x weights[p] + bias[p].
+    padded_values has shape (B, P, K), weights has shape (P, K, N), bias has
+    shape (P, N), and out has shape (B, P, N). Without autograd, out is
+    contiguous so that out.view(-1, N) is free.
+    The TRITON kernel is a forward-only grouped GEMM and is used for inference.
+    """
+    if not is_fx_tracing():
+        P, K, N = weights.shape
+        torch._assert(padded_values.dim() == 3, "padded_values must be 3D")
+        torch._assert(padded_values.shape[1] == P, "wrong padded_values shape[1]")
+        torch._assert(padded_values.shape[2] == K, "wrong padded_values shape[2]")
+        torch._assert(bias.shape[0] == P, "wrong bias shape[0]")
+        torch._assert(bias.shape[1] == N, "wrong bias shape[1]")
+    if kernel == HammerKernel.TRITON:
+        return triton_contextual_linear_fwd(
+            padded_values=padded_values,
+            weights=weights,
+            bias=bias,
+        )
+    return pytorch_contextual_linear(
+        padded_values=padded_values,
+        weights=weights,
+        bias=bias,
+    )
+
+
+def contextual_proj_jagged(
+    values: torch.Tensor,
+    offsets: torch.Tensor,
+    seq_lengths: torch.Tensor,
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
+    weights: torch.Tensor,
+    bias: torch.Tensor,
+    weight_scales: Optional[torch.Tensor] = None,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> torch.Tensor:
+    """
+    Computing out[b, p] = x[b, p] x weights[p] + bias[p] directly from F jagged
+    contextual features, without materializing the padded x.
+    x[b, p] is row position_to_index[p] of feature position_to_feature[p] for
+    batch b, or zeros if that feature is shorter or seq_lengths[b] < min_uih_lengths[p].
+    min_uih_lengths is None when no position has a minimum, skipping the check.
+    values has shape (sum_F(sum_B(L_fi)), K) and offsets has shape (F, B + 1),
+    weights has shape (P, K, N), bias has shape (P, N), and out has shape (B, P, N)
+    If weight_scales of shape (P, N) is given, weights is int8 and is dequantized
+    as weights[p, :, n] * weight_scales[p, n] (inference only).
+    """
+    if not is_fx_tracing():
+        P, K, N = weights.shape
+        torch._assert(values.dim() == 2, "values must be 2D")
+        torch._assert(values.shape[1] == K, "wrong values shape[1]")
+        torch._assert(offsets.dim() == 2, "offsets must be 2D")
+        torch._assert(
+            offsets.shape[1] == seq_lengths.shape[0] + 1, "wrong offsets shape[1]"
+        )
+        torch._assert(position_to_feature.shape[0] == P, "wrong position_to_feature")
+        torch._assert(position_to_index.shape[0] == P, "wrong position_to_index")
+        if min_uih_lengths is not None:
+            torch._assert(min_uih_lengths.shape[0] == P, "wrong min_uih_lengths")
+        torch._assert(bias.shape[0] == P, "wrong bias shape[0]")
+        torch._assert(bias.shape[1] == N, "wrong bias shape[1]")
+        if weight_scales is not None:
+            torch._assert(weights.dtype == torch.int8, "weights must be int8")
+            torch._assert(weight_scales.shape[0] == P, "wrong weight_scales shape[0]")
+            torch._assert(weight_scales.shape[1] == N, "wrong weight_scales shape[1]")
+    if kernel == HammerKernel.TRITON:
+        return triton_contextual_proj_jagged(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+            weights=weights,
+            bias=bias,
+            weight_scales=weight_scales,
+        )
+    else:
+        return pytorch_contextual_proj_jagged(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+            weights=weights,
+            bias=bias,
+            weight_scales=weight_scales,
+        )
+
+
+def add_scalar_and_cumsum(
+    lengths: torch.Tensor,
+    scalar: int,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Returns (lengths + scalar, complete cumsum of lengths + scalar); the TRITON
+    kernel computes both in one launch.
+    """
+    if not is_fx_tracing():
+        torch._assert(lengths.dim() == 1, "lengths must be 1D")
+    if kernel == HammerKernel.TRITON:
+        return triton_add_scalar_and_cumsum(lengths=lengths, scalar=scalar)
+    else:
+        return pytorch_add_scalar_and_cumsum(lengths=lengths, scalar=scalar)
@@ -17,12 +17,13 @@
 # pyre-strict
 
 
-from typing import List
+from typing import List, Optional
 
 import torch
 from generative_recommenders.ops.pytorch.pt_layer_norm import (
     pytorch_layer_norm,
     pytorch_swish_layer_norm,
+    pytorch_swish_layer_norm_mlp,
 )
 from generative_recommenders.ops.triton.triton_layer_norm import triton_rms_norm
 
@@ -37,10 +38,14 @@ from generative_recommenders.ops.triton.triton_layer_norm import (
     triton_layer_norm,
     triton_swish_layer_norm,
 )
+from generative_recommenders.ops.triton.triton_layer_norm_mlp import (
+    triton_swish_layer_norm_mlp_fwd,
+)
 from torch.fx._symbolic_trace import is_fx_tracing
 
 torch.fx.wrap("triton_layer_norm")
 torch.fx.wrap("triton_swish_layer_norm")
+torch.fx.wrap("triton_swish_layer_norm_mlp_fwd")
 
 
 def layer_norm(
@@ -109,6 +114,61 @@ def swish_layer_norm(
         )
 
 
+def swish_layer_norm_mlp(
+    x: torch.Tensor,
+    w1: torch.Tensor,
+    b1: torch.Tensor,
+    ln1_weight: torch.Tensor,
+    ln1_bias: torch.Tensor,
+    w2: torch.Tensor,
+    b2: torch.Tensor,
+    ln2_weight: torch.Tensor,
+    ln2_bias: torch.Tensor,
+    eps1: float = 1e-5,
+    eps2: float = 1e-5,
+    residual: Optional[torch.Tensor] = None,
+    kernel: HammerKernel = HammerKernel.PYTORCH,
+) -> torch.Tensor:
+    """
+    Computes Linear(w1, b1) -> SwishLayerNorm -> Linear(w2, b2) -> LayerNorm,
+    with w1 and w2 in torch.nn.Linear layout, plus residual if given. The
+    Triton kernel keeps the hidden activations on chip and is forward only,
+    so it must not be used when gradients are needed.
+    """
+    if kernel == HammerKernel.TRITON:
+        if not is_fx_tracing():
+            torch._assert(not x.is_cpu, "x must be device tensor")
+        return triton_swish_layer_norm_mlp_fwd(
+            x,
+            w1,
+            b1,
+            ln1_weight,
+            ln1_bias,
+            w2,
+            b2,
+            ln2_weight,
+            ln2_bias,
+            eps1,
+            eps2,
+            residual,
+        )
+    else:
+        return pytorch_swish_layer_norm_mlp(
+            x,
+            w1,
+            b1,
+            ln1_weight,
+            ln1_bias,
+            w2,
+            b2,
+            ln2_weight,
+            ln2_bias,
+            eps1,
+            eps2,
+            residual,
+        )
+
+
 class LayerNorm(HammerModule):
     def __init__(
         self,
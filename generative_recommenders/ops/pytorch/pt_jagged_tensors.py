@@ -96,6 +96,63 @@ def pytorch_concat_2D_jagged(
     )
 
 
+@torch.fx.wrap
+def pytorch_concat_2D_jagged_with_zero_left(
+    max_len_left: int,
+    values_right: torch.Tensor,
+    max_len_right: int,
+    offsets_right: Optional[torch.Tensor],
+) -> torch.Tensor:
+    if offsets_right is None:
+        return torch.nn.functional.pad(
+            values_right.view(-1, max_len_right, values_right.size(-1)),
+            (0, 0, max_len_left, 0),
+        ).flatten(0, 1)
+    lengths_right = offsets_right[1:] - offsets_right[:-1]
+    padded_right = torch.ops.fbgemm.jagged_to_padded_dense(
+        values=values_right,
+        offsets=[offsets_right],
+        max_lengths=[max_len_right],
+        padding_value=0.0,
+    )
+    concatted_dense = torch.nn.functional.pad(padded_right, (0, 0, max_len_left, 0))
+    mask = fx_arange(max_len_left + max_len_right, device=offsets_right.device).view(
+        1, -1
+    )
+    mask = mask < max_len_left + lengths_right.view(-1, 1)
+    return concatted_dense.flatten(0, 1)[mask.view(-1), :]
+
+
+@torch.fx.wrap
+def pytorch_concat_1D_jagged(
+    values_left: Optional[torch.Tensor],
+    values_right: torch.Tensor,
+    max_len_left: int,
+    max_len_right: int,
+    offsets_right: torch.Tensor,
+) -> torch.Tensor:
+    B = offsets_right.size(0) - 1
+    lengths_right = offsets_right[1:] - offsets_right[:-1]
+    padded_right = torch.ops.fbgemm.jagged_to_padded_dense(
+        values=values_right.unsqueeze(-1),
+        offsets=[offsets_right],
+        max_lengths=[max_len_right],
+        padding_value=0.0,
+    ).squeeze(-1)
+    if values_left is None:
+        concatted_dense = torch.nn.functional.pad(padded_right, (max_len_left, 0))
+    else:
+        concatted_dense = torch.cat(
+            [values_left.view(B, max_len_left).to(padded_right.dtype), padded_right],
+            dim=1,
+        )
+    mask = fx_arange(max_len_left + max_len_right, device=offsets_right.device).view(
+        1, -1
+    )
+    mask = mask < max_len_left + lengths_right.view(-1, 1)
+    return concatted_dense.flatten()[mask.view(-1)]
+
+
 def _split_2D_jagged_jagged(
     max_seq_len: int,
     values: torch.Tensor,
@@ -226,3 +283,99 @@ def pytorch_hstu_concat_l2_embeddings(
         ),
     )
     return padded_x.flatten(0, 1)[mask.view(-1), :]
+
+
+@torch.fx.wrap
+def pytorch_contextual_jagged_to_padded_dense(
+    values: torch.Tensor,
+    offsets: torch.Tensor,
+    seq_lengths: torch.Tensor,
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
+) -> torch.Tensor:
+    B = seq_lengths.size(0)
+    P = position_to_feature.size(0)
+    if values.size(0) == 0:
+        return torch.zeros(
+            (B, P, values.size(1)), dtype=values.dtype, device=values.device
+        )
+    position_offsets = offsets[position_to_feature.long()]
+    rows = position_offsets[:, :-1] + position_to_index.view(-1, 1)
+    mask = rows < position_offsets[:, 1:]
+    if min_uih_lengths is not None:
+        mask = torch.logical_and(
+            mask, seq_lengths.view(1, -1) >= min_uih_lengths.view(-1, 1)
+        )
+    padded_values = values[torch.where(mask, rows, 0).t()]
+    # the gather output is fresh, so zero the masked rows in place
+    return padded_values.masked_fill_(~mask.t().unsqueeze(-1), 0.0)
+
+
+@torch.fx.wrap
+def pytorch_contextual_linear(
+    padded_values: torch.Tensor,
+    weights: torch.Tensor,
+    bias: torch.Tensor,
+) -> torch.Tensor:
+    if torch.is_autocast_enabled() or (
+        torch.is_grad_enabled()
+        and (padded_values.requires_grad or weights.requires_grad or bias.requires_grad)
+    ):
+        # out= is not differentiable, and autocast does not apply to it;
+        # baddbmm keeps the bias add in the autocast dtype
+        return torch.baddbmm(
+            bias.unsqueeze(1), padded_values.transpose(0, 1), weights
+        ).transpose(0, 1)
+    B, P, _ = padded_values.shape
+    out = torch.empty(
+        (B, P, weights.shape[2]),
+        dtype=padded_values.dtype,
+        device=padded_values.device,
+    )
+    # bmm writes each (B, N) slice straight into the strided (B, P, N) output,
+    # so out stays contiguous and later flattens to (B * P, N) without a copy
+    torch.baddbmm(
+        bias.unsqueeze(1),
+        padded_values.transpose(0, 1),
+        weights,
+        out=out.transpose(0, 1),
+    )
+    return out
+
+
+@torch.fx.wrap
+def pytorch_contextual_proj_jagged(
+    values: torch.Tensor,
+    offsets: torch.Tensor,
+    seq_lengths: torch.Tensor,
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
+    weights: torch.Tensor,
+    bias: torch.Tensor,
+    weight_scales: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    padded_values = pytorch_contextual_jagged_to_padded_dense(
+        values=values,
+        offsets=offsets,
+        seq_lengths=seq_lengths,
+        position_to_feature=position_to_feature,
+        position_to_index=position_to_index,
+        min_uih_lengths=min_uih_lengths,
+    )
+    if weight_scales is not None:
+        # dequantize in fp32 and round to the activation dtype once
+        out = torch.einsum("bpi,pio->bpo", padded_values.float(), weights.float())
+        out = out * weight_scales.float().unsqueeze(0) + bias.float().unsqueeze(0)
+        return out.to(padded_values.dtype)
+    return pytorch_contextual_linear(padded_values, weights, bias)
+
+
+@torch.fx.wrap
+def pytorch_add_scalar_and_cumsum(
+    lengths: torch.Tensor,
+    scalar: int,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    new_lengths = lengths + scalar
+    return new_lengths, torch.ops.fbgemm.asynchronous_complete_cumsum(new_lengths)
@@ -16,7 +16,7 @@
 # pyre-strict
 
 
-from typing import List
+from typing import List, Optional
 
 import torch
 
@@ -59,3 +59,36 @@ def pytorch_swish_layer_norm(
             )
         )
     ).to(dtype)
+
+
+def pytorch_swish_layer_norm_mlp(
+    x: torch.Tensor,
+    w1: torch.Tensor,
+    b1: torch.Tensor,
+    ln1_weight: torch.Tensor,
+    ln1_bias: torch.Tensor,
+    w2: torch.Tensor,
+    b2: torch.Tensor,
+    ln2_weight: torch.Tensor,
+    ln2_bias: torch.Tensor,
+    eps1: float,
+    eps2: float,
+    residual: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    h = pytorch_swish_layer_norm(
+        torch.nn.functional.linear(x, w1, b1),
+        [w1.shape[0]],
+        ln1_weight,
+        ln1_bias,
+        eps1,
+    )
+    y = pytorch_layer_norm(
+        torch.nn.functional.linear(h, w2, b2),
+        [w2.shape[0]],
+        ln2_weight,
+        ln2_bias,
+        eps2,
+    )
+    if residual is not None:
+        y = y + residual
+    return y
@@ -18,7 +18,7 @@
 
 import unittest
 
-from typing import Optional
+from typing import List, Optional
 
 import torch
 
@@ -318,6 +318,193 @@ class JaggedTensorsTest(unittest.TestCase):
             torch.testing.assert_close(ref_d_a, real_d_a)
             torch.testing.assert_close(ref_d_b, real_d_b)
 
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore
+    @given(
+        batch_size=st.integers(2, 8),
+        max_len_a=st.integers(1, 20),
+        max_len_b=st.integers(20, 100),
+        D=st.integers(10, 30),
+        num_pairs=st.integers(1, 3),
+        is_dense_b=st.sampled_from([True, False]),
+        dtype=st.sampled_from(
+            [torch.bfloat16, torch.float32]
+            if torch.cuda.get_device_capability(torch.device("cuda"))[0] >= 8
+            else [torch.float32]
+        ),
+    )
+    @settings(
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+        deadline=None,
+    )
+    def test_concat_2D_jagged_multi_triton(
+        self,
+        batch_size: int,
+        max_len_a: int,
+        max_len_b: int,
+        D: int,
+        num_pairs: int,
+        is_dense_b: bool,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+        from generative_recommenders.ops.jagged_tensors import concat_2D_jagged_multi
+
+        if is_dense_b:
+            offsets_b = None
+            total_len_b = batch_size * max_len_b
+        else:
+            lengths_b = torch.randint(
+                0, max_len_b + 1, size=(batch_size,), device=torch.device("cuda")
+            )
+            offsets_b = torch.ops.fbgemm.asynchronous_complete_cumsum(lengths_b)
+            total_len_b = int(offsets_b[-1].item())
+        # the last pair has a zero left side and integer values
+        values_a: List[Optional[torch.Tensor]] = [
+            torch.empty(
+                (batch_size * max_len_a, D), dtype=dtype, device=torch.device("cuda")
+            )
+            .uniform_(-1.0, 1.0)
+            .requires_grad_()
+            for _ in range(num_pairs)
+        ] + [None]
+        values_b: List[torch.Tensor] = [
+            torch.empty((total_len_b, D), dtype=dtype, device=torch.device("cuda"))
+            .uniform_(-1.0, 1.0)
+            .requires_grad_()
+            for _ in range(num_pairs)
+        ] + [
+            torch.randint(
+                0,
+                1000,
+                (total_len_b, 1),
+                dtype=torch.int64,
+                device=torch.device("cuda"),
+            )
+        ]
+
+        ref_values = concat_2D_jagged_multi(
+            values_left=values_a,
+            values_right=values_b,
+            max_len_left=max_len_a,
+            max_len_right=max_len_b,
+            offsets_right=offsets_b,
+            kernel=HammerKernel.PYTORCH,
+        )
+        douts = [torch.randn_like(v) for v in ref_values[:num_pairs]]
+        torch.autograd.backward(ref_values[:num_pairs], douts)
+        ref_grads = []
+        for v in values_a[:num_pairs] + values_b[:num_pairs]:
+            assert v is not None and v.grad is not None
+            ref_grads.append(v.grad.clone())
+            v.grad = None
+
+        real_values = concat_2D_jagged_multi(
+            values_left=values_a,
+            values_right=values_b,
+            max_len_left=max_len_a,
+            max_len_right=max_len_b,
+            offsets_right=offsets_b,
+            kernel=HammerKernel.TRITON,
+        )
+        for ref, real in zip(ref_values, real_values):
+            torch.testing.assert_close(ref, real)
+        torch.autograd.backward(real_values[:num_pairs], douts)
+        for ref_grad, v in zip(ref_grads, values_a[:num_pairs] + values_b[:num_pairs]):
+            assert v is not None and v.grad is not None
+            torch.testing.assert_close(ref_grad, v.grad)
+
+        # inference: results are written into the given out buffers
+        with torch.no_grad():
+            out = [torch.empty_like(v) for v in ref_values]
+            out_values = concat_2D_jagged_multi(
+                values_left=values_a,
+                values_right=values_b,
+                max_len_left=max_len_a,
+                max_len_right=max_len_b,
+                offsets_right=offsets_b,
+                out=out,
+                kernel=HammerKernel.TRITON,
+            )
+        for ref, o, out_value in zip(ref_values, out, out_values):
+            self.assertEqual(o.data_ptr(), out_value.data_ptr())
+            torch.testing.assert_close(ref, out_value)
+
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore
+    @given(
+        batch_size=st.integers(1, 8),
+        max_len_a=st.integers(0, 20),
+        max_len_b=st.integers(1, 2000),
+        is_zero_a=st.sampled_from([True, False]),
+        dtype=st.sampled_from([torch.float32, torch.int64]),
+    )
+    @settings(
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+        deadline=None,
+    )
+    def test_concat_1D_jagged_triton(
+        self,
+        batch_size: int,
+        max_len_a: int,
+        max_len_b: int,
+        is_zero_a: bool,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+        from generative_recommenders.ops.jagged_tensors import concat_1D_jagged
+
+        device = torch.device("cuda")
+        lengths_b = torch.randint(0, max_len_b + 1, size=(batch_size,), device=device)
+        offsets_b = torch.ops.fbgemm.asynchronous_complete_cumsum(lengths_b)
+        total_len_b = int(offsets_b[-1].item())
+        requires_grad = dtype == torch.float32
+        values_a = (
+            None
+            if is_zero_a
+            else torch.randint(0, 1000, (batch_size * max_len_a,), device=device)
+            .to(dtype)
+            .requires_grad_(requires_grad)
+        )
+        values_b = (
+            torch.randint(0, 1000, (total_len_b,), device=device)
+            .to(dtype)
+            .requires_grad_(requires_grad)
+        )
+
+        ref_values = concat_1D_jagged(
+            values_left=values_a,
+            values_right=values_b,
+            max_len_left=max_len_a,
+            max_len_right=max_len_b,
+            offsets_right=offsets_b,
+            kernel=HammerKernel.PYTORCH,
+        )
+        real_values = concat_1D_jagged(
+            values_left=values_a,
+            values_right=values_b,
+            max_len_left=max_len_a,
+            max_len_right=max_len_b,
+            offsets_right=offsets_b,
+            kernel=HammerKernel.TRITON,
+        )
+        torch.testing.assert_close(ref_values, real_values)
+        if not requires_grad:
+            return
+
+        dout = torch.randn_like(ref_values)
+        ref_values.backward(dout)
+        # pyre-ignore
+        ref_d_b, values_b.grad = values_b.grad.clone(), None
+        if values_a is not None:
+            ref_d_a, values_a.grad = values_a.grad.clone(), None
+        real_values.backward(dout)
+        torch.testing.assert_close(ref_d_b, values_b.grad)
+        if values_a is not None:
+            torch.testing.assert_close(ref_d_a, values_a.grad)
+
     # pyre-ignore
     @given(
         batch_size=st.integers(2, 8),
@@ -718,3 +905,350 @@ class JaggedTensorsTest(unittest.TestCase):
                 atol=atol,
                 rtol=rtol,
             )
+
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore
+    @given(
+        batch_size=st.integers(1, 70),
+        max_lengths=st.lists(st.integers(1, 4), min_size=1, max_size=3),
+        min_uih_length=st.sampled_from([None, 0, 5]),
+        K=st.integers(16, 200),
+        N=st.integers(16, 200),
+        int8_weights=st.sampled_from([False, True]),
+        dtype=st.sampled_from(
+            [torch.float32, torch.bfloat16]
+            if torch.cuda.get_device_capability(torch.device("cuda"))[0] >= 8
+            else [torch.float32]
+        ),
+    )
+    @settings(
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+        deadline=None,
+    )
+    def test_contextual_proj_jagged_triton(
+        self,
+        batch_size: int,
+        max_lengths: List[int],
+        min_uih_length: Optional[int],
+        K: int,
+        N: int,
+        int8_weights: bool,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+        torch.backends.cudnn.allow_tf32 = False
+        torch.backends.cuda.matmul.allow_tf32 = False
+        from generative_recommenders.ops.jagged_tensors import contextual_proj_jagged
+
+        device = torch.device("cuda")
+        P = sum(max_lengths)
+        offsets_list = []
+        base = 0
+        for max_len in max_lengths:
+            # lengths may exceed max_len, the extra rows must be ignored
+            lengths = torch.randint(0, max_len + 2, size=(batch_size,), device=device)
+            offsets = torch.zeros((batch_size + 1,), dtype=torch.int64, device=device)
+            offsets[1:] = torch.cumsum(lengths, dim=0)
+            offsets_list.append(offsets + base)
+            base += int(offsets[-1].item())
+        offsets = torch.stack(offsets_list, dim=0)
+        position_to_feature = torch.tensor(
+            [i for i, max_len in enumerate(max_lengths) for _ in range(max_len)],
+            dtype=torch.int32,
+            device=device,
+        )
+        position_to_index = torch.tensor(
+            [j for max_len in max_lengths for j in range(max_len)],
+            dtype=torch.int32,
+            device=device,
+        )
+        min_uih_lengths = (
+            torch.tensor(
+                [min_uih_length if i % 2 == 0 else 0 for i in range(P)],
+                dtype=torch.int32,
+                device=device,
+            )
+            if min_uih_length is not None
+            else None
+        )
+        seq_lengths = torch.randint(0, 10, size=(batch_size,), device=device)
+        values = (
+            torch.empty((base, K), dtype=dtype, device=device)
+            .uniform_(-1.0, 1.0)
+            .requires_grad_()
+        )
+        weights = (
+            torch.empty((P, K, N), dtype=dtype, device=device)
+            .uniform_(-0.1, 0.1)
+            .requires_grad_()
+        )
+        bias = (
+            torch.empty((P, N), dtype=dtype, device=device)
+            .uniform_(-1.0, 1.0)
+            .requires_grad_()
+        )
+
+        if int8_weights:
+            # forward only: int8 weights are an inference path
+            weights_int8 = torch.randint(
+                -127, 128, (P, K, N), dtype=torch.int8, device=device
+            )
+            weight_scales = torch.empty((P, N), device=device).uniform_(1e-4, 1e-3)
+            with torch.no_grad():
+                ref_out, real_out = [
+                    contextual_proj_jagged(
+                        values=values,
+                        offsets=offsets,
+                        seq_lengths=seq_lengths,
+                        position_to_feature=position_to_feature,
+                        position_to_index=position_to_index,
+                        min_uih_lengths=min_uih_lengths,
+                        weights=weights_int8,
+                        bias=bias,
+                        weight_scales=weight_scales,
+                        kernel=kernel,
+                    )
+                    for kernel in [HammerKernel.PYTORCH, HammerKernel.TRITON]
+                ]
+            torch.testing.assert_close(ref_out, real_out)
+            return
+
+        ref_out = contextual_proj_jagged(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+            weights=weights,
+            bias=bias,
+            kernel=HammerKernel.PYTORCH,
+        )
+        dout = torch.randn_like(ref_out) * 0.01
+        ref_out.backward(dout)
+        # pyre-ignore
+        ref_d_values, values.grad = values.grad.clone(), None
+        ref_d_weights, weights.grad = weights.grad.clone(), None
+        ref_d_bias, bias.grad = bias.grad.clone(), None
+
+        values = values.detach().clone().requires_grad_()
+        weights = weights.detach().clone().requires_grad_()
+        bias = bias.detach().clone().requires_grad_()
+        real_out = contextual_proj_jagged(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+            weights=weights,
+            bias=bias,
+            kernel=HammerKernel.TRITON,
+        )
+        torch.testing.assert_close(ref_out, real_out)
+        real_out.backward(dout.detach().clone())
+        torch.testing.assert_close(ref_d_values, values.grad)
+        torch.testing.assert_close(ref_d_weights, weights.grad)
+        torch.testing.assert_close(ref_d_bias, bias.grad)
+
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore
+    @given(
+        batch_size=st.integers(1, 70),
+        max_lengths=st.lists(st.integers(1, 4), min_size=1, max_size=3),
+        min_uih_length=st.sampled_from([None, 0, 5]),
+        D=st.integers(16, 200),
+        dtype=st.sampled_from(
+            [torch.float32, torch.bfloat16]
+            if torch.cuda.get_device_capability(torch.device("cuda"))[0] >= 8
+            else [torch.float32]
+        ),
+    )
+    @settings(
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+        deadline=None,
+    )
+    def test_contextual_jagged_to_padded_dense_triton(
+        self,
+        batch_size: int,
+        max_lengths: List[int],
+        min_uih_length: Optional[int],
+        D: int,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+        from generative_recommenders.ops.jagged_tensors import (
+            contextual_jagged_to_padded_dense,
+        )
+
+        device = torch.device("cuda")
+        P = sum(max_lengths)
+        offsets_list = []
+        base = 0
+        for max_len in max_lengths:
+            # lengths may exceed max_len, the extra rows must be ignored
+            lengths = torch.randint(0, max_len + 2, size=(batch_size,), device=device)
+            offsets = torch.zeros((batch_size + 1,), dtype=torch.int64, device=device)
+            offsets[1:] = torch.cumsum(lengths, dim=0)
+            offsets_list.append(offsets + base)
+            base += int(offsets[-1].item())
+        offsets = torch.stack(offsets_list, dim=0)
+        position_to_feature = torch.tensor(
+            [i for i, max_len in enumerate(max_lengths) for _ in range(max_len)],
+            dtype=torch.int32,
+            device=device,
+        )
+        position_to_index = torch.tensor(
+            [j for max_len in max_lengths for j in range(max_len)],
+            dtype=torch.int32,
+            device=device,
+        )
+        min_uih_lengths = (
+            torch.tensor(
+                [min_uih_length if i % 2 == 0 else 0 for i in range(P)],
+                dtype=torch.int32,
+                device=device,
+            )
+            if min_uih_length is not None
+            else None
+        )
+        seq_lengths = torch.randint(0, 10, size=(batch_size,), device=device)
+        values = (
+            torch.empty((base, D), dtype=dtype, device=device)
+            .uniform_(-1.0, 1.0)
+            .requires_grad_()
+        )
+
+        ref_out = contextual_jagged_to_padded_dense(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+            kernel=HammerKernel.PYTORCH,
+        )
+        dout = torch.randn_like(ref_out)
+        ref_out.backward(dout)
+        # pyre-ignore
+        ref_d_values, values.grad = values.grad.clone(), None
+
+        values = values.detach().clone().requires_grad_()
+        real_out = contextual_jagged_to_padded_dense(
+            values=values,
+            offsets=offsets,
+            seq_lengths=seq_lengths,
+            position_to_feature=position_to_feature,
+            position_to_index=position_to_index,
+            min_uih_lengths=min_uih_lengths,
+            kernel=HammerKernel.TRITON,
+        )
+        torch.testing.assert_close(ref_out, real_out)
+        real_out.backward(dout.detach().clone())
+        torch.testing.assert_close(ref_d_values, values.grad)
+
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore
+    @given(
+        batch_size=st.integers(0, 70),
+        P=st.integers(1, 12),
+        K=st.integers(16, 200),
+        N=st.integers(16, 200),
+        dtype=st.sampled_from(
+            [torch.float32, torch.bfloat16]
+            if torch.cuda.get_device_capability(torch.device("cuda"))[0] >= 8
+            else [torch.float32]
+        ),
+    )
+    @settings(
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+        deadline=None,
+    )
+    def test_contextual_linear_triton(
+        self,
+        batch_size: int,
+        P: int,
+        K: int,
+        N: int,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+        torch.backends.cudnn.allow_tf32 = False
+        torch.backends.cuda.matmul.allow_tf32 = False
+        from generative_recommenders.ops.jagged_tensors import contextual_linear
+
+        device = torch.device("cuda")
+        padded_values = torch.empty(
+            (batch_size, P, K), dtype=dtype, device=device
+        ).uniform_(-1.0, 1.0)
+        weights = torch.empty((P, K, N), dtype=dtype, device=device).uniform_(-0.1, 0.1)
+        bias = torch.empty((P, N), dtype=dtype, device=device).uniform_(-1.0, 1.0)
+        with torch.no_grad():
+            ref_out, real_out = [
+                contextual_linear(
+                    padded_values=padded_values,
+                    weights=weights,
+                    bias=bias,
+                    kernel=kernel,
+                )
+                for kernel in [HammerKernel.PYTORCH, HammerKernel.TRITON]
+            ]
+        self.assertTrue(real_out.is_contiguous())
+        torch.testing.assert_close(ref_out, real_out)
+
+        # neither the no-grad out= path nor the autograd path may leave the
+        # autocast dtype, e.g. by adding an fp32 bias
+        if torch.cuda.get_device_capability(device)[0] >= 8 and dtype == torch.float32:
+            with torch.no_grad(), torch.autocast("cuda", dtype=torch.bfloat16):
+                autocast_out = contextual_linear(
+                    padded_values=padded_values,
+                    weights=weights,
+                    bias=bias,
+                    kernel=HammerKernel.PYTORCH,
+                )
+            self.assertEqual(autocast_out.dtype, torch.bfloat16)
+            with torch.autocast("cuda", dtype=torch.bfloat16):
+                autocast_out = contextual_linear(
+                    padded_values=padded_values.detach().requires_grad_(),
+                    weights=weights.detach().requires_grad_(),
+                    bias=bias.detach().requires_grad_(),
+                    kernel=HammerKernel.PYTORCH,
+                )
+            self.assertEqual(autocast_out.dtype, torch.bfloat16)
+            self.assertTrue(autocast_out.requires_grad)
+
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore
+    @given(
+        batch_size=st.sampled_from([0, 1, 15, 1024, 3000]),
+        scalar=st.integers(0, 20),
+        dtype=st.sampled_from([torch.int32, torch.int64]),
+    )
+    @settings(
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+        deadline=None,
+    )
+    def test_add_scalar_and_cumsum_triton(
+        self,
+        batch_size: int,
+        scalar: int,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+        from generative_recommenders.ops.jagged_tensors import add_scalar_and_cumsum
+
+        lengths = torch.randint(
+            0, 100, size=(batch_size,), dtype=dtype, device=torch.device("cuda")
+        )
+        ref_lengths, ref_offsets = add_scalar_and_cumsum(
+            lengths=lengths, scalar=scalar, kernel=HammerKernel.PYTORCH
+        )
+        real_lengths, real_offsets = add_scalar_and_cumsum(
+            lengths=lengths, scalar=scalar, kernel=HammerKernel.TRITON
+        )
+        torch.testing.assert_close(ref_lengths, real_lengths)
+        torch.testing.assert_close(ref_offsets, real_offsets)
@@ -25,6 +25,7 @@ from generative_recommenders.ops.layer_norm import (
     layer_norm,
     LayerNorm,
     swish_layer_norm,
+    swish_layer_norm_mlp,
     SwishLayerNorm,
 )
 
@@ -229,3 +230,77 @@ class LayerNormTest(unittest.TestCase):
             ref_db,
             opt_db,
         )
+
+    @unittest.skipIf(*gpu_unavailable)
+    # pyre-ignore[56]
+    @given(
+        N=st.integers(min_value=0, max_value=10000),
+        K=st.integers(min_value=16, max_value=256),
+        H=st.sampled_from([64, 256]),
+        D=st.integers(min_value=32, max_value=512),
+        has_residual=st.sampled_from([True, False]),
+        large_mean=st.sampled_from([True, False]),
+        dtype=st.sampled_from(
+            [torch.bfloat16, torch.float32]
+            if torch.cuda.get_device_capability(torch.device("cuda"))[0] >= 8
+            else [torch.float32]
+        ),
+    )
+    @settings(
+        deadline=None,
+        verbosity=Verbosity.verbose,
+        max_examples=20,
+    )
+    def test_swish_layer_norm_mlp(
+        self,
+        N: int,
+        K: int,
+        H: int,
+        D: int,
+        has_residual: bool,
+        large_mean: bool,
+        dtype: torch.dtype,
+    ) -> None:
+        set_dev_mode(True)
+
+        def _rand(*shape: int) -> torch.Tensor:
+            return torch.empty(
+                shape, dtype=dtype, device=torch.device("cuda")
+            ).uniform_(-1.0, 1.0)
+
+        x = _rand(N, K)
+        params = [
+            _rand(H, K) / K**0.5,
+            _rand(H),
+            _rand(H),
+            _rand(H),
+            _rand(D, H) / H**0.5,
+            # a large b2 gives hidden activations with |mean| >> std going
+            # into the second layer norm; bf16 cannot resolve them at all
+            _rand(D) + (1000.0 if large_mean and dtype == torch.float32 else 0.0),
+            _rand(D),
+            _rand(D),
+        ]
+        residual = _rand(N, D) if has_residual else None
+        ref_out = swish_layer_norm_mlp(
+            x,
+            *params,
+            eps1=1e-5,
+            eps2=1e-6,
+            residual=residual,
+            kernel=HammerKernel.PYTORCH,
+        )
+        opt_out = swish_layer_norm_mlp(
+            x,
+            *params,
+            eps1=1e-5,
+            eps2=1e-6,
+            residual=residual,
+            kernel=HammerKernel.TRITON,
+        )
+        torch.testing.assert_close(
+            ref_out,
+            opt_out,
+            atol=2e-2 if dtype == torch.bfloat16 else 5e-3,
+            rtol=2e-2 if dtype == torch.bfloat16 else 5e-3,
+        )
@@ -15,7 +15,7 @@
 #!/usr/bin/env python3
 
 
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import torch
 
@@ -25,7 +25,10 @@ import triton
 # @manual=//triton:triton
 import triton.language as tl
 
-from generative_recommenders.common import switch_to_contiguous_if_needed
+from generative_recommenders.common import (
+    switch_to_contiguous_if_needed,
+    triton_autotune,
+)
 
 
 @triton.jit
@@ -350,6 +353,372 @@ class _Split2DJaggedFunction(torch.autograd.Function):
         return None, d_jagged_in, None, None, None, None, None
 
 
+@triton.jit
+def _concat_2D_jagged_dense_left_row(
+    ValuesA,
+    ValuesB,
+    Out,
+    D,
+    stride_ad,
+    stride_bd,
+    stride_od,
+    row_a,
+    row_b,
+    row_out,
+    from_a,
+    IS_ZERO_A: tl.constexpr,
+    BLOCK_D: tl.constexpr,
+):
+    offs_d = tl.arange(0, BLOCK_D)
+    mask_d = offs_d < D
+    if from_a:
+        if IS_ZERO_A:
+            v = tl.zeros([BLOCK_D], dtype=Out.dtype.element_ty)
+        else:
+            v = tl.load(ValuesA + row_a * stride_ad + offs_d, mask=mask_d)
+            v = v.to(Out.dtype.element_ty)
+    else:
+        v = tl.load(ValuesB + row_b * stride_bd + offs_d, mask=mask_d)
+        v = v.to(Out.dtype.element_ty)
+    tl.store(Out + row_out * stride_od + offs_d, v, mask=mask_d)
+
+
+@triton.jit
+def _concat_2D_jagged_multi(
+    ValuesA0,
+    ValuesB0,
+    Out0,
+    D0,
+    stride_a0d,
+    stride_b0d,
+    stride_o0d,
+    ValuesA1,
+    ValuesB1,
+    Out1,
+    D1,
+    stride_a1d,
+    stride_b1d,
+    stride_o1d,
+    OffsetsB,
+    MaxLenA,
+    MaxLenB,
+    IS_DENSE_B: tl.constexpr,
+    IS_ZERO_A0: tl.constexpr,
+    IS_ZERO_A1: tl.constexpr,
+    HAS_PAIR1: tl.constexpr,
+    BLOCK_D0: tl.constexpr,
+    BLOCK_D1: tl.constexpr,
+):
+    off_z = tl.program_id(1)
+    off_n = tl.program_id(0)
+    seq_start_a = off_z * MaxLenA
+    seq_len_a = MaxLenA
+    if IS_DENSE_B:
+        seq_start_b = off_z * MaxLenB
+        seq_len_b = MaxLenB
+    else:
+        seq_start_b = tl.load(OffsetsB + off_z)
+        seq_end_b = tl.load(OffsetsB + off_z + 1)
+        seq_len_b = seq_end_b - seq_start_b
+    if off_n >= seq_len_a + seq_len_b:
+        return
+    # index arithmetic is shared by every (left, right) pair
+    from_a = off_n < seq_len_a
+    row_a = (seq_start_a + off_n).to(tl.int64)
+    row_b = (seq_start_b + off_n - seq_len_a).to(tl.int64)
+    row_out = (seq_start_a + seq_start_b + off_n).to(tl.int64)
+    _concat_2D_jagged_dense_left_row(
+        ValuesA0,
+        ValuesB0,
+        Out0,
+        D0,
+        stride_a0d,
+        stride_b0d,
+        stride_o0d,
+        row_a,
+        row_b,
+        row_out,
+        from_a,
+        IS_ZERO_A0,
+        BLOCK_D0,
+    )
+    if HAS_PAIR1:
+        _concat_2D_jagged_dense_left_row(
+            ValuesA1,
+            ValuesB1,
+            Out1,
+            D1,
+            stride_a1d,
+            stride_b1d,
+            stride_o1d,
+            row_a,
+            row_b,
+            row_out,
+            from_a,
+            IS_ZERO_A1,
+            BLOCK_D1,
+        )
+
+
+class _Concat2DJaggedMultiFunction(torch.autograd.Function):
+    @staticmethod
+    # pyre-ignore[14]
+    def forward(
+        ctx,
+        max_len_a: int,
+        max_len_b: int,
+        offsets_b: Optional[torch.Tensor],
+        out: Optional[List[torch.Tensor]],
+        *values: Optional[torch.Tensor],
+    ) -> Tuple[torch.Tensor, ...]:
+        # values is [left_0, right_0, left_1, right_1, ...]; lefts are dense
+        # with max_len_a rows per sequence, and None means all zeros.
+        values_a = [
+            switch_to_contiguous_if_needed(v) if v is not None else None
+            for v in values[0::2]
+        ]
+        values_b = []
+        for v in values[1::2]:
+            assert v is not None
+            values_b.append(switch_to_contiguous_if_needed(v))
+        is_dense_b = offsets_b is None
+        if is_dense_b:
+            B = values_b[0].shape[0] // max_len_b
+        else:
+            assert offsets_b is not None
+            B = offsets_b.shape[0] - 1
+        total_len_a = B * max_len_a
+        max_seq_len = max_len_a + max_len_b
+        values_out = []
+        for i, (a, b) in enumerate(zip(values_a, values_b)):
+            assert (
+                a is None or a.shape[1] == b.shape[1]
+            ), "left and right values must have the same shape[1]"
+            out_shape = (total_len_a + b.shape[0], b.shape[1])
+            if out is not None:
+                assert out[i].shape == out_shape, "wrong out shape"
+                assert out[i].stride(1) == 1, "out must be row contiguous"
+                values_out.append(out[i])
+            else:
+                values_out.append(
+                    torch.empty(out_shape, device=b.device, dtype=b.dtype)
+                )
+        for i in range(0, len(values_b), 2):
+            j = min(i + 1, len(values_b) - 1)
+            a0, b0, out0 = values_a[i], values_b[i], values_out[i]
+            a1, b1, out1 = values_a[j], values_b[j], values_out[j]
+            _concat_2D_jagged_multi[(max_seq_len, B)](
+                ValuesA0=a0,
+                ValuesB0=b0,
+                Out0=out0,
+                D0=b0.shape[1],
+                stride_a0d=a0.stride(0) if a0 is not None else 0,
+                stride_b0d=b0.stride(0),
+                stride_o0d=out0.stride(0),
+                ValuesA1=a1,
+                ValuesB1=b1,
+                Out1=out1,
+                D1=b1.shape[1],
+                stride_a1d=a1.stride(0) if a1 is not None else 0,
+                stride_b1d=b1.stride(0),
+                stride_o1d=out1.stride(0),
+                OffsetsB=offsets_b,
+                MaxLenA=max_len_a,
+                MaxLenB=max_len_b,
+                # pyre-ignore[6]
+                IS_DENSE_B=is_dense_b,
+                # pyre-ignore[6]
+                IS_ZERO_A0=a0 is None,
+                # pyre-ignore[6]
+                IS_ZERO_A1=a1 is None,
+                # pyre-ignore[6]
+                HAS_PAIR1=j > i,
+                BLOCK_D0=triton.next_power_of_2(b0.shape[1]),
+                BLOCK_D1=triton.next_power_of_2(b1.shape[1]),
+            )
+        ctx.save_for_backward(offsets_b)
+        ctx.set_materialize_grads(False)
+        ctx.max_seq_len = max_seq_len
+        ctx.max_len_a = max_len_a
+        ctx.max_len_b = max_len_b
+        ctx.is_dense_b = is_dense_b
+        ctx.is_zero_a = [a is None for a in values_a]
+        ctx.total_len_a = total_len_a
+        ctx.total_len_b = [b.shape[0] for b in values_b]
+        ctx.B = B
+        return tuple(values_out)
+
+    @staticmethod
+    # pyre-ignore[14]
+    def backward(
+        ctx, *d_outs: Optional[torch.Tensor]
+    ) -> Tuple[Optional[torch.Tensor], ...]:
+        (offsets_b,) = ctx.saved_tensors
+        d_values: List[Optional[torch.Tensor]] = []
+        for i, d_out in enumerate(d_outs):
+            if d_out is None or not (
+                ctx.needs_input_grad[4 + 2 * i] or ctx.needs_input_grad[5 + 2 * i]
+            ):
+                d_values.extend([None, None])
+                continue
+            D = d_out.shape[1]
+            # a zero left still needs somewhere to split its gradient into;
+            # it is dropped below
+            d_values_a = torch.empty(
+                (ctx.total_len_a, D), device=d_out.device, dtype=d_out.dtype
+            )
+            d_values_b = torch.empty(
+                (ctx.total_len_b[i], D), device=d_out.device, dtype=d_out.dtype
+            )
+            _split_2D_jagged[(ctx.max_seq_len, ctx.B)](
+                JaggedIn=d_out,
+                OffsetsA=None,
+                OffsetsB=offsets_b,
+                MaxLenA=ctx.max_len_a,
+                MaxLenB=ctx.max_len_b,
+                OutA=d_values_a,
+                OutB=d_values_b,
+                D=D,
+                stride_id=d_out.stride(-2),
+                stride_ad=d_values_a.stride(-2),
+                stride_bd=d_values_b.stride(-2),
+                n_prefix_to_B=0,
+                # pyre-ignore[6]
+                IS_DENSE_A=True,
+                IS_DENSE_B=ctx.is_dense_b,
+                BLOCK_D=triton.next_power_of_2(D),
+            )
+            d_values.extend([None if ctx.is_zero_a[i] else d_values_a, d_values_b])
+        return (None, None, None, None, *d_values)
+
+
+@triton.jit
+def _concat_1D_jagged(
+    ValuesA,
+    ValuesB,
+    OffsetsB,
+    Out,
+    MaxLenA,
+    IS_ZERO_A: tl.constexpr,
+    IS_SPLIT: tl.constexpr,
+    BLOCK_N: tl.constexpr,
+):
+    """
+    Computing Out[b] = concat(ValuesA[b], ValuesB[b]) for 1D values, where
+    ValuesA is dense with MaxLenA values per sequence (zeros if IS_ZERO_A) and
+    ValuesB is jagged. If IS_SPLIT, splits Out back into ValuesA and ValuesB.
+    """
+    off_b = tl.program_id(1)
+    offs_n = tl.program_id(0) * BLOCK_N + tl.arange(0, BLOCK_N)
+    seq_start_b = tl.load(OffsetsB + off_b).to(tl.int64)
+    seq_end_b = tl.load(OffsetsB + off_b + 1).to(tl.int64)
+    mask = offs_n < MaxLenA + seq_end_b - seq_start_b
+    mask_a = mask & (offs_n < MaxLenA)
+    mask_b = mask & (offs_n >= MaxLenA)
+    seq_start_a = off_b.to(tl.int64) * MaxLenA
+    b_ptrs = ValuesB + seq_start_b + offs_n - MaxLenA
+    out_ptrs = Out + seq_start_a + seq_start_b + offs_n
+    if IS_SPLIT:
+        v = tl.load(out_ptrs, mask=mask)
+        if not IS_ZERO_A:
+            tl.store(ValuesA + seq_start_a + offs_n, v, mask=mask_a)
+        tl.store(b_ptrs, v, mask=mask_b)
+    else:
+        v = tl.load(b_ptrs, mask=mask_b, other=0)
+        if not IS_ZERO_A:
+            v_a = tl.load(ValuesA + seq_start_a + offs_n, mask=mask_a, other=0)
+            v = tl.where(mask_a, v_a, v)
+        tl.store(out_ptrs, v.to(Out.dtype.element_ty), mask=mask)
+
+
+class _Concat1DJaggedFunction(torch.autograd.Function):
+    @staticmethod
+    # pyre-ignore[14]
+    def forward(
+        ctx,
+        values_a: Optional[torch.Tensor],
+        values_b: torch.Tensor,
+        max_len_a: int,
+        max_len_b: int,
+        offsets_b: torch.Tensor,
+    ) -> torch.Tensor:
+        if values_a is not None:
+            values_a = switch_to_contiguous_if_needed(values_a)
+        values_b = switch_to_contiguous_if_needed(values_b)
+        B = offsets_b.shape[0] - 1
+        total_len_b = values_b.shape[0]
+        values_out = torch.empty(
+            (B * max_len_a + total_len_b,),
+            device=values_b.device,
+            dtype=values_b.dtype,
+        )
+        BLOCK_N = min(triton.next_power_of_2(max_len_a + max_len_b), 1024)
+        grid = (triton.cdiv(max_len_a + max_len_b, BLOCK_N), B)
+        _concat_1D_jagged[grid](
+            ValuesA=values_a,
+            ValuesB=values_b,
+            OffsetsB=offsets_b,
+            Out=values_out,
+            MaxLenA=max_len_a,
+            # pyre-ignore[6]
+            IS_ZERO_A=values_a is None,
+            IS_SPLIT=False,
+            BLOCK_N=BLOCK_N,
+        )
+        ctx.save_for_backward(offsets_b)
+        ctx.is_zero_a = values_a is None
+        ctx.max_len_a = max_len_a
+        ctx.total_len_b = total_len_b
+        ctx.grid = grid
+        ctx.BLOCK_N = BLOCK_N
+        return values_out
+
+    @staticmethod
+    # pyre-ignore[14]
+    def backward(
+        ctx, d_out: torch.Tensor
+    ) -> Tuple[Optional[torch.Tensor], torch.Tensor, None, None, None]:
+        (offsets_b,) = ctx.saved_tensors
+        d_out = switch_to_contiguous_if_needed(d_out)
+        B = offsets_b.shape[0] - 1
+        d_values_a: Optional[torch.Tensor] = None
+        if not ctx.is_zero_a:
+            d_values_a = torch.empty(
+                (B * ctx.max_len_a,), device=d_out.device, dtype=d_out.dtype
+            )
+        d_values_b = torch.empty(
+            (ctx.total_len_b,), device=d_out.device, dtype=d_out.dtype
+        )
+        _concat_1D_jagged[ctx.grid](
+            ValuesA=d_values_a,
+            ValuesB=d_values_b,
+            OffsetsB=offsets_b,
+            Out=d_out,
+            MaxLenA=ctx.max_len_a,
+            IS_ZERO_A=ctx.is_zero_a,
+            IS_SPLIT=True,
+            BLOCK_N=ctx.BLOCK_N,
+        )
+        return d_values_a, d_values_b, None, None, None
+
+
+@torch.fx.wrap
+def triton_concat_1D_jagged(
+    values_left: Optional[torch.Tensor],
+    values_right: torch.Tensor,
+    max_len_left: int,
+    max_len_right: int,
+    offsets_right: torch.Tensor,
+) -> torch.Tensor:
+    return _Concat1DJaggedFunction.apply(
+        values_left,
+        values_right,
+        max_len_left,
+        max_len_right,
+        offsets_right,
+    )
+
+
 @torch.fx.wrap
 def triton_concat_2D_jagged(
     values_left: torch.Tensor,
@@ -371,6 +740,29 @@ def triton_concat_2D_jagged(
     )
 
 
+@torch.fx.wrap
+def triton_concat_2D_jagged_multi(
+    values_left: List[Optional[torch.Tensor]],
+    values_right: List[torch.Tensor],
+    max_len_left: int,
+    max_len_right: int,
+    offsets_right: Optional[torch.Tensor],
+    out: Optional[List[torch.Tensor]] = None,
+) -> List[torch.Tensor]:
+    values: List[Optional[torch.Tensor]] = []
+    for left, right in zip(values_left, values_right):
+        values.extend([left, right])
+    return list(
+        _Concat2DJaggedMultiFunction.apply(
+            max_len_left,
+            max_len_right,
+            offsets_right,
+            out,
+            *values,
+        )
+    )
+
+
 @torch.fx.wrap
 def triton_split_2D_jagged(
     max_seq_len: int,
@@ -390,3 +782,809 @@ def triton_split_2D_jagged(
         offsets_right,
         n_prefix_to_right,
     )
+
+
+@triton.jit
+def _contextual_jagged_to_padded_dense(
+    Jagged,
+    Dense,
+    Offsets,
+    SeqLengths,
+    PositionToFeature,
+    PositionToIndex,
+    MinUIHLengths,
+    D,
+    stride_jn,
+    stride_db,
+    stride_dp,
+    stride_of,
+    SCATTER_OUT: tl.constexpr,
+    HAS_MIN_UIH: tl.constexpr,
+    BLOCK_D: tl.constexpr,
+):
+    """
+    Computing Dense[b, p] = Jagged[row(b, p)], or zeros if row(b, p) is masked,
+    with row(b, p) as in _contextual_proj_jagged. If SCATTER_OUT, copies
+    Dense[b, p] back to Jagged[row(b, p)] for the rows that are not masked.
+    """
+    off_p = tl.program_id(0)
+    off_b = tl.program_id(1)
+
+    feature = tl.load(PositionToFeature + off_p)
+    index = tl.load(PositionToIndex + off_p)
+    Offsets += feature.to(tl.int64) * stride_of
+    seq_start = tl.load(Offsets + off_b)
+    seq_end = tl.load(Offsets + off_b + 1)
+    is_valid = index < seq_end - seq_start
+    if HAS_MIN_UIH:
+        min_uih_len = tl.load(MinUIHLengths + off_p)
+        seq_len = tl.load(SeqLengths + off_b)
+        is_valid = is_valid & (seq_len >= min_uih_len)
+
+    offs_d = tl.arange(0, BLOCK_D)
+    mask_d = offs_d < D
+    dense_ptrs = (
+        Dense + off_b.to(tl.int64) * stride_db + off_p.to(tl.int64) * stride_dp + offs_d
+    )
+    jagged_ptrs = Jagged + (seq_start + index).to(tl.int64) * stride_jn + offs_d
+    if SCATTER_OUT:
+        if is_valid:
+            v = tl.load(dense_ptrs, mask=mask_d)
+            tl.store(jagged_ptrs, v, mask=mask_d)
+    else:
+        v = tl.load(jagged_ptrs, mask=mask_d & is_valid, other=0.0)
+        tl.store(dense_ptrs, v, mask=mask_d)
+
+
+class _ContextualJaggedToPaddedDenseFunction(torch.autograd.Function):
+    @staticmethod
+    # pyre-ignore[14]
+    def forward(
+        ctx,
+        values: torch.Tensor,
+        offsets: torch.Tensor,
+        seq_lengths: torch.Tensor,
+        position_to_feature: torch.Tensor,
+        position_to_index: torch.Tensor,
+        min_uih_lengths: Optional[torch.Tensor],
+    ) -> torch.Tensor:
+        values = switch_to_contiguous_if_needed(values)
+        offsets = offsets.contiguous()
+        B = seq_lengths.size(0)
+        P = position_to_feature.size(0)
+        L, D = values.shape
+        out = torch.empty((B, P, D), dtype=values.dtype, device=values.device)
+        ctx.save_for_backward(
+            offsets,
+            seq_lengths,
+            position_to_feature,
+            position_to_index,
+            min_uih_lengths,
+        )
+        ctx.L = L
+        if B == 0 or P == 0:
+            return out
+        _contextual_jagged_to_padded_dense[(P, B)](
+            Jagged=values,
+            Dense=out,
+            Offsets=offsets,
+            SeqLengths=seq_lengths,
+            PositionToFeature=position_to_feature,
+            PositionToIndex=position_to_index,
+            MinUIHLengths=min_uih_lengths,
+            D=D,
+            stride_jn=values.stride(0),
+            stride_db=out.stride(0),
+            stride_dp=out.stride(1),
+            stride_of=offsets.stride(0),
+            SCATTER_OUT=False,
+            # pyre-ignore[6]
+            HAS_MIN_UIH=min_uih_lengths is not None,
+            BLOCK_D=triton.next_power_of_2(D),
+        )
+        return out
+
+    @staticmethod
+    # pyre-ignore[14]
+    def backward(
+        ctx, d_out: torch.Tensor
+    ) -> Tuple[torch.Tensor, None, None, None, None, None]:
+        (
+            offsets,
+            seq_lengths,
+            position_to_feature,
+            position_to_index,
+            min_uih_lengths,
+        ) = ctx.saved_tensors
+        d_out = switch_to_contiguous_if_needed(d_out)
+        B, P, D = d_out.shape
+        # rows that are never gathered (padding, masked) receive no gradient
+        d_values = torch.zeros((ctx.L, D), dtype=d_out.dtype, device=d_out.device)
+        if B == 0 or P == 0:
+            return d_values, None, None, None, None, None
+        _contextual_jagged_to_padded_dense[(P, B)](
+            Jagged=d_values,
+            Dense=d_out,
+            Offsets=offsets,
+            SeqLengths=seq_lengths,
+            PositionToFeature=position_to_feature,
+            PositionToIndex=position_to_index,
+            MinUIHLengths=min_uih_lengths,
+            D=D,
+            stride_jn=d_values.stride(0),
+            stride_db=d_out.stride(0),
+            stride_dp=d_out.stride(1),
+            stride_of=offsets.stride(0),
+            SCATTER_OUT=True,
+            # pyre-ignore[6]
+            HAS_MIN_UIH=min_uih_lengths is not None,
+            BLOCK_D=triton.next_power_of_2(D),
+        )
+        return d_values, None, None, None, None, None
+
+
+@torch.fx.wrap
+def triton_contextual_jagged_to_padded_dense(
+    values: torch.Tensor,
+    offsets: torch.Tensor,
+    seq_lengths: torch.Tensor,
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
+) -> torch.Tensor:
+    return _ContextualJaggedToPaddedDenseFunction.apply(
+        values,
+        offsets,
+        seq_lengths,
+        position_to_feature,
+        position_to_index,
+        min_uih_lengths,
+    )
+
+
+def _get_contextual_proj_jagged_configs() -> List[triton.Config]:
+    configs = []
+    for BLOCK_B in [16, 64]:
+        for BLOCK_N in [64, 128]:
+            for BLOCK_K in [32, 64]:
+                for num_stages in [2, 3]:
+                    for num_warps in [4, 8]:
+                        configs.append(
+                            triton.Config(
+                                {
+                                    "BLOCK_B": BLOCK_B,
+                                    "BLOCK_N": BLOCK_N,
+                                    "BLOCK_K": BLOCK_K,
+                                },
+                                num_stages=num_stages,
+                                num_warps=num_warps,
+                            )
+                        )
+    return configs
+
+
+def _get_contextual_proj_jagged_bwd_dw_configs() -> List[triton.Config]:
+    configs = []
+    for BLOCK_M in [32, 64]:
+        for BLOCK_N in [64, 128]:
+            for BLOCK_B in [32, 64]:
+                for num_warps in [4, 8]:
+                    configs.append(
+                        triton.Config(
+                            {
+                                "BLOCK_M": BLOCK_M,
+                                "BLOCK_N": BLOCK_N,
+                                "BLOCK_B": BLOCK_B,
+                            },
+                            num_stages=2,
+                            num_warps=num_warps,
+                        )
+                    )
+    return configs
+
+
+@triton_autotune(
+    configs=_get_contextual_proj_jagged_configs(),
+    key=["AUTOTUNE_B", "K", "N"],
+)
+@triton.jit
+def _contextual_proj_jagged(
+    Jagged,
+    Dense,
+    Offsets,
+    SeqLengths,
+    PositionToFeature,
+    PositionToIndex,
+    MinUIHLengths,
+    Weights,
+    WeightScales,
+    Bias,
+    AUTOTUNE_B,
+    B,
+    K,
+    N,
+    stride_jn,
+    stride_db,
+    stride_dp,
+    stride_of,
+    stride_wp,
+    stride_wk,
+    stride_wn,
+    stride_sp,
+    stride_bp,
+    SCATTER_OUT: tl.constexpr,
+    HAS_MIN_UIH: tl.constexpr,
+    HAS_WEIGHT_SCALES: tl.constexpr,
+    HAS_BIAS: tl.constexpr,
+    ALLOW_TF32: tl.constexpr,
+    BLOCK_B: tl.constexpr,
+    BLOCK_N: tl.constexpr,
+    BLOCK_K: tl.constexpr,
+):
+    """
+    Computing Dense[b, p] = Jagged[row(b, p)] x Weights[p] + Bias[p], or
+    Jagged[row(b, p)] = Dense[b, p] x Weights[p] if SCATTER_OUT.
+    row(b, p) is the PositionToIndex[p]-th row of feature PositionToFeature[p]
+    for batch b; it is treated as zeros (or skipped) when the feature is
+    shorter than that, or, if HAS_MIN_UIH, when SeqLengths[b] < MinUIHLengths[p].
+    Jagged has shape (sum_F(sum_B(L_fi)), K), Offsets has shape (F, B + 1),
+    Weights has shape (P, K, N), Bias has shape (P, N), Dense has shape (B, P, N)
+    If HAS_WEIGHT_SCALES, Weights is int8 and is dequantized as
+    Weights[p, k, n] * WeightScales[p, n], with WeightScales of shape (P, N).
+    """
+    off_n = tl.program_id(0)
+    off_b = tl.program_id(1)
+    off_p = tl.program_id(2)
+
+    feature = tl.load(PositionToFeature + off_p)
+    index = tl.load(PositionToIndex + off_p)
+
+    offs_b = off_b * BLOCK_B + tl.arange(0, BLOCK_B)
+    offs_n = off_n * BLOCK_N + tl.arange(0, BLOCK_N)
+    offs_k = tl.arange(0, BLOCK_K)
+    mask_b = offs_b < B
+
+    Offsets += feature.to(tl.int64) * stride_of
+    seq_starts = tl.load(Offsets + offs_b, mask=mask_b, other=0)
+    seq_ends = tl.load(Offsets + offs_b + 1, mask=mask_b, other=0)
+    mask_j = mask_b & (index < seq_ends - seq_starts)
+    if HAS_MIN_UIH:
+        min_uih_len = tl.load(MinUIHLengths + off_p)
+        seq_lengths = tl.load(SeqLengths + offs_b, mask=mask_b, other=0)
+        mask_j = mask_j & (seq_lengths >= min_uih_len)
+    rows = (seq_starts + index).to(tl.int64)
+
+    Dense += off_p.to(tl.int64) * stride_dp
+    Weights += off_p.to(tl.int64) * stride_wp
+    if SCATTER_OUT:
+        in_ptrs = Dense + offs_b[:, None].to(tl.int64) * stride_db + offs_k[None, :]
+        mask_in = mask_b
+    else:
+        in_ptrs = Jagged + rows[:, None] * stride_jn + offs_k[None, :]
+        mask_in = mask_j
+    w_ptrs = Weights + offs_k[:, None] * stride_wk + offs_n[None, :] * stride_wn
+
+    accumulator = tl.zeros((BLOCK_B, BLOCK_N), dtype=tl.float32)
+    for k in range(0, K, BLOCK_K):
+        x = tl.load(
+            in_ptrs,
+            mask=mask_in[:, None] & ((k + offs_k)[None, :] < K),
+            other=0.0,
+        )
+        w = tl.load(
+            w_ptrs,
+            mask=((k + offs_k)[:, None] < K) & (offs_n[None, :] < N),
+            other=0.0,
+        )
+        if HAS_WEIGHT_SCALES:
+            w = w.to(x.dtype)
+        accumulator += tl.dot(x, w, allow_tf32=ALLOW_TF32)
+        in_ptrs += BLOCK_K
+        w_ptrs += BLOCK_K * stride_wk
+
+    if HAS_WEIGHT_SCALES:
+        scales = tl.load(
+            WeightScales + off_p * stride_sp + offs_n, mask=offs_n < N, other=0.0
+        )
+        accumulator *= scales[None, :].to(tl.float32)
+    if HAS_BIAS:
+        bias = tl.load(Bias + off_p * stride_bp + offs_n, mask=offs_n < N)
+        accumulator += bias[None, :].to(tl.float32)
+
+    if SCATTER_OUT:
+        out_ptrs = Jagged + rows[:, None] * stride_jn + offs_n[None, :]
+        tl.store(
+            out_ptrs,
+            accumulator.to(Jagged.dtype.element_ty),
+            mask=mask_j[:, None] & (offs_n[None, :] < N),
+        )
+    else:
+        out_ptrs = Dense + offs_b[:, None].to(tl.int64) * stride_db + offs_n[None, :]
+        tl.store(
+            out_ptrs,
+            accumulator.to(Dense.dtype.element_ty),
+            mask=mask_b[:, None] & (offs_n[None, :] < N),
+        )
+
+
+@triton_autotune(
+    configs=_get_contextual_proj_jagged_bwd_dw_configs(),
+    key=["AUTOTUNE_B", "K", "N"],
+)
+@triton.jit
+def _contextual_proj_jagged_bwd_dw(
+    Jagged,
+    Dense,
+    Offsets,
+    SeqLengths,
+    PositionToFeature,
+    PositionToIndex,
+    MinUIHLengths,
+    DWeights,
+    DBias,
+    AUTOTUNE_B,
+    B,
+    K,
+    N,
+    stride_jn,
+    stride_db,
+    stride_dp,
+    stride_of,
+    stride_dwp,
+    stride_dwk,
+    stride_dbp,
+    HAS_MIN_UIH: tl.constexpr,
+    ALLOW_TF32: tl.constexpr,
+    BLOCK_M: tl.constexpr,
+    BLOCK_N: tl.constexpr,
+    BLOCK_B: tl.constexpr,
+):
+    """
+    Computing DWeights[p] = sum_b(Jagged[row(b, p)]^T x Dense[b, p]) and
+    DBias[p] = sum_b(Dense[b, p]), with row(b, p) as in _contextual_proj_jagged
+    """
+    off_p = tl.program_id(0)
+    off_m = tl.program_id(1)
+    off_n = tl.program_id(2)
+
+    feature = tl.load(PositionToFeature + off_p)
+    index = tl.load(PositionToIndex + off_p)
+    if HAS_MIN_UIH:
+        min_uih_len = tl.load(MinUIHLengths + off_p)
+
+    offs_m = off_m * BLOCK_M + tl.arange(0, BLOCK_M)
+    offs_n = off_n * BLOCK_N + tl.arange(0, BLOCK_N)
+    offs_b = tl.arange(0, BLOCK_B)
+
+    Offsets += feature.to(tl.int64) * stride_of
+    Dense += off_p.to(tl.int64) * stride_dp
+    accumulator = tl.zeros((BLOCK_M, BLOCK_N), dtype=tl.float32)
+    acc_bias = tl.zeros((BLOCK_N,), dtype=tl.float32)
+    for b in range(0, B, BLOCK_B):
+        cur_b = b + offs_b
+        mask_b = cur_b < B
+        seq_starts = tl.load(Offsets + cur_b, mask=mask_b, other=0)
+        seq_ends = tl.load(Offsets + cur_b + 1, mask=mask_b, other=0)
+        mask_j = mask_b & (index < seq_ends - seq_starts)
+        if HAS_MIN_UIH:
+            seq_lengths = tl.load(SeqLengths + cur_b, mask=mask_b, other=0)
+            mask_j = mask_j & (seq_lengths >= min_uih_len)
+        rows = (seq_starts + index).to(tl.int64)
+        x = tl.load(
+            Jagged + rows[None, :] * stride_jn + offs_m[:, None],
+            mask=mask_j[None, :] & (offs_m[:, None] < K),
+            other=0.0,
+        )
+        dy = tl.load(
+            Dense + cur_b[:, None].to(tl.int64) * stride_db + offs_n[None, :],
+            mask=mask_b[:, None] & (offs_n[None, :] < N),
+            other=0.0,
+        )
+        accumulator += tl.dot(x, dy, allow_tf32=ALLOW_TF32)
+        if off_m == 0:
+            acc_bias += tl.sum(dy.to(tl.float32), axis=0)
+
+    dw_ptrs = (
+        DWeights
+        + off_p.to(tl.int64) * stride_dwp
+        + offs_m[:, None] * stride_dwk
+        + offs_n[None, :]
+    )
+    tl.store(
+        dw_ptrs,
+        accumulator.to(DWeights.dtype.element_ty),
+        mask=(offs_m[:, None] < K) & (offs_n[None, :] < N),
+    )
+    if off_m == 0:
+        tl.store(
+            DBias + off_p * stride_dbp + offs_n,
+            acc_bias.to(DBias.dtype.element_ty),
+            mask=offs_n < N,
+        )
+
+
+class _ContextualProjJaggedFunction(torch.autograd.Function):
+    @staticmethod
+    # pyre-ignore[14]
+    def forward(
+        ctx,
+        values: torch.Tensor,
+        offsets: torch.Tensor,
+        seq_lengths: torch.Tensor,
+        position_to_feature: torch.Tensor,
+        position_to_index: torch.Tensor,
+        min_uih_lengths: Optional[torch.Tensor],
+        weights: torch.Tensor,
+        bias: torch.Tensor,
+        weight_scales: Optional[torch.Tensor],
+    ) -> torch.Tensor:
+        values = switch_to_contiguous_if_needed(values)
+        offsets = offsets.contiguous()
+        bias = switch_to_contiguous_if_needed(bias)
+        if weight_scales is not None:
+            weight_scales = switch_to_contiguous_if_needed(weight_scales)
+        B = seq_lengths.size(0)
+        P, K, N = weights.shape
+        out = torch.empty((B, P, N), dtype=values.dtype, device=values.device)
+
+        grid = lambda meta: (  # noqa E731
+            triton.cdiv(N, meta["BLOCK_N"]),
+            triton.cdiv(B, meta["BLOCK_B"]),
+            P,
+        )
+        _contextual_proj_jagged[grid](
+            Jagged=values,
+            Dense=out,
+            Offsets=offsets,
+            SeqLengths=seq_lengths,
+            PositionToFeature=position_to_feature,
+            PositionToIndex=position_to_index,
+            MinUIHLengths=min_uih_lengths,
+            Weights=weights,
+            WeightScales=weight_scales,
+            Bias=bias,
+            AUTOTUNE_B=triton.next_power_of_2(B),
+            B=B,
+            K=K,
+            N=N,
+            stride_jn=values.stride(0),
+            stride_db=out.stride(0),
+            stride_dp=out.stride(1),
+            stride_of=offsets.stride(0),
+            stride_wp=weights.stride(0),
+            stride_wk=weights.stride(1),
+            stride_wn=weights.stride(2),
+            stride_sp=weight_scales.stride(0) if weight_scales is not None else 0,
+            stride_bp=bias.stride(0),
+            SCATTER_OUT=False,
+            # pyre-ignore[6]
+            HAS_MIN_UIH=min_uih_lengths is not None,
+            # pyre-ignore[6]
+            HAS_WEIGHT_SCALES=weight_scales is not None,
+            HAS_BIAS=True,
+            ALLOW_TF32=torch.backends.cuda.matmul.allow_tf32,
+        )
+
+        ctx.save_for_backward(
+            values,
+            offsets,
+            seq_lengths,
+            position_to_feature,
+            position_to_index,
+            min_uih_lengths,
+            weights,
+        )
+        ctx.B = B
+        ctx.P = P
+        ctx.K = K
+        ctx.N = N
+        ctx.has_weight_scales = weight_scales is not None
+        return out
+
+    @staticmethod
+    # pyre-ignore[14]
+    def backward(ctx, d_out: torch.Tensor) -> Tuple[
+        torch.Tensor,
+        None,
+        None,
+        None,
+        None,
+        None,
+        torch.Tensor,
+        torch.Tensor,
+        None,
+    ]:
+        assert not ctx.has_weight_scales, "int8 contextual weights are inference only"
+        (
+            values,
+            offsets,
+            seq_lengths,
+            position_to_feature,
+            position_to_index,
+            min_uih_lengths,
+            weights,
+        ) = ctx.saved_tensors
+        d_out = d_out.contiguous()
+        # rows that are never gathered (padding, masked) receive no gradient
+        d_values = torch.zeros_like(values)
+        d_weights = torch.empty(
+            (ctx.P, ctx.K, ctx.N), dtype=weights.dtype, device=weights.device
+        )
+        d_bias = torch.empty((ctx.P, ctx.N), dtype=weights.dtype, device=weights.device)
+
+        grid = lambda meta: (  # noqa E731
+            triton.cdiv(ctx.K, meta["BLOCK_N"]),
+            triton.cdiv(ctx.B, meta["BLOCK_B"]),
+            ctx.P,
+        )
+        _contextual_proj_jagged[grid](
+            Jagged=d_values,
+            Dense=d_out,
+            Offsets=offsets,
+            SeqLengths=seq_lengths,
+            PositionToFeature=position_to_feature,
+            PositionToIndex=position_to_index,
+            MinUIHLengths=min_uih_lengths,
+            Weights=weights,
+            WeightScales=None,
+            Bias=None,
+            AUTOTUNE_B=triton.next_power_of_2(ctx.B),
+            B=ctx.B,
+            K=ctx.N,
+            N=ctx.K,
+            stride_jn=d_values.stride(0),
+            stride_db=d_out.stride(0),
+            stride_dp=d_out.stride(1),
+            stride_of=offsets.stride(0),
+            stride_wp=weights.stride(0),
+            stride_wk=weights.stride(2),
+            stride_wn=weights.stride(1),
+            stride_sp=0,
+            stride_bp=0,
+            SCATTER_OUT=True,
+            # pyre-ignore[6]
+            HAS_MIN_UIH=min_uih_lengths is not None,
+            HAS_WEIGHT_SCALES=False,
+            HAS_BIAS=False,
+            ALLOW_TF32=torch.backends.cuda.matmul.allow_tf32,
+        )
+
+        grid = lambda meta: (  # noqa E731
+            ctx.P,
+            triton.cdiv(ctx.K, meta["BLOCK_M"]),
+            triton.cdiv(ctx.N, meta["BLOCK_N"]),
+        )
+        _contextual_proj_jagged_bwd_dw[grid](
+            Jagged=values,
+            Dense=d_out,
+            Offsets=offsets,
+            SeqLengths=seq_lengths,
+            PositionToFeature=position_to_feature,
+            PositionToIndex=position_to_index,
+            MinUIHLengths=min_uih_lengths,
+            DWeights=d_weights,
+            DBias=d_bias,
+            AUTOTUNE_B=triton.next_power_of_2(ctx.B),
+            B=ctx.B,
+            K=ctx.K,
+            N=ctx.N,
+            stride_jn=values.stride(0),
+            stride_db=d_out.stride(0),
+            stride_dp=d_out.stride(1),
+            stride_of=offsets.stride(0),
+            stride_dwp=d_weights.stride(0),
+            stride_dwk=d_weights.stride(1),
+            stride_dbp=d_bias.stride(0),
+            # pyre-ignore[6]
+            HAS_MIN_UIH=min_uih_lengths is not None,
+            ALLOW_TF32=torch.backends.cuda.matmul.allow_tf32,
+        )
+        return d_values, None, None, None, None, None, d_weights, d_bias, None
+
+
+@torch.fx.wrap
+def triton_contextual_proj_jagged(
+    values: torch.Tensor,
+    offsets: torch.Tensor,
+    seq_lengths: torch.Tensor,
+    position_to_feature: torch.Tensor,
+    position_to_index: torch.Tensor,
+    min_uih_lengths: Optional[torch.Tensor],
+    weights: torch.Tensor,
+    bias: torch.Tensor,
+    weight_scales: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    return _ContextualProjJaggedFunction.apply(
+        values,
+        offsets,
+        seq_lengths,
+        position_to_feature,
+        position_to_index,
+        min_uih_lengths,
+        weights,
+        bias,
+        weight_scales,
+    )
+
+
+@triton_autotune(
+    configs=_get_contextual_proj_jagged_configs(),
+    key=["AUTOTUNE_B", "K", "N"],
+)
+@triton.jit
+def _contextual_linear_fwd(
+    X,
+    Weights,
+    Bias,
+    Y,
+    AUTOTUNE_B,
+    B,
+    K,
+    N,
+    stride_xb,
+    stride_xp,
+    stride_wp,
+    stride_wk,
+    stride_bp,
+    stride_yb,
+    stride_yp,
+    ALLOW_TF32: tl.constexpr,
+    BLOCK_B: tl.constexpr,
+    BLOCK_N: tl.constexpr,
+    BLOCK_K: tl.constexpr,
+):
+    """
+    Computing Y[b, p] = X[b, p] x Weights[p] + Bias[p] as a grouped GEMM with
+    one group per position p, where X has shape (B, P, K), Weights has shape
+    (P, K, N), Bias has shape (P, N) and Y has shape (B, P, N).
+    """
+    off_n = tl.program_id(0)
+    off_b = tl.program_id(1)
+    off_p = tl.program_id(2)
+
+    offs_b = off_b * BLOCK_B + tl.arange(0, BLOCK_B)
+    offs_n = off_n * BLOCK_N + tl.arange(0, BLOCK_N)
+    offs_k = tl.arange(0, BLOCK_K)
+    mask_b = offs_b < B
+    mask_n = offs_n < N
+
+    x_ptrs = (
+        X
+        + off_p.to(tl.int64) * stride_xp
+        + offs_b[:, None].to(tl.int64) * stride_xb
+        + offs_k[None, :]
+    )
+    w_ptrs = (
+        Weights
+        + off_p.to(tl.int64) * stride_wp
+        + offs_k[:, None] * stride_wk
+        + offs_n[None, :]
+    )
+    accumulator = tl.zeros((BLOCK_B, BLOCK_N), dtype=tl.float32)
+    for k in range(0, K, BLOCK_K):
+        x = tl.load(
+            x_ptrs,
+            mask=mask_b[:, None] & ((k + offs_k)[None, :] < K),
+            other=0.0,
+        )
+        w = tl.load(
+            w_ptrs,
+            mask=((k + offs_k)[:, None] < K) & mask_n[None, :],
+            other=0.0,
+        )
+        accumulator += tl.dot(x, w, allow_tf32=ALLOW_TF32)
+        x_ptrs += BLOCK_K
+        w_ptrs += BLOCK_K * stride_wk
+    bias = tl.load(Bias + off_p * stride_bp + offs_n, mask=mask_n)
+    accumulator += bias[None, :].to(tl.float32)
+
+    y_ptrs = (
+        Y
+        + off_p.to(tl.int64) * stride_yp
+        + offs_b[:, None].to(tl.int64) * stride_yb
+        + offs_n[None, :]
+    )
+    tl.store(
+        y_ptrs,
+        accumulator.to(Y.dtype.element_ty),
+        mask=mask_b[:, None] & mask_n[None, :],
+    )
+
+
+@torch.fx.wrap
+def triton_contextual_linear_fwd(
+    padded_values: torch.Tensor,
+    weights: torch.Tensor,
+    bias: torch.Tensor,
+) -> torch.Tensor:
+    if padded_values.stride(-1) != 1:
+        padded_values = padded_values.contiguous()
+    weights = switch_to_contiguous_if_needed(weights)
+    bias = switch_to_contiguous_if_needed(bias)
+    B, P, K = padded_values.shape
+    _, _, N = weights.shape
+    out = torch.empty((B, P, N), dtype=padded_values.dtype, device=padded_values.device)
+    if B == 0:
+        return out
+
+    grid = lambda meta: (  # noqa E731
+        triton.cdiv(N, meta["BLOCK_N"]),
+        triton.cdiv(B, meta["BLOCK_B"]),
+        P,
+    )
+    _contextual_linear_fwd[grid](
+        X=padded_values,
+        Weights=weights,
+        Bias=bias,
+        Y=out,
+        AUTOTUNE_B=triton.next_power_of_2(B),
+        B=B,
+        K=K,
+        N=N,
+        stride_xb=padded_values.stride(0),
+        stride_xp=padded_values.stride(1),
+        stride_wp=weights.stride(0),
+        stride_wk=weights.stride(1),
+        stride_bp=bias.stride(0),
+        stride_yb=out.stride(0),
+        stride_yp=out.stride(1),
+        ALLOW_TF32=torch.backends.cuda.matmul.allow_tf32,
+    )
+    return out
+
+
+@triton.jit
+def _add_scalar_and_cumsum(
+    Lengths,
+    NewLengths,
+    NewOffsets,
+    B,
+    scalar,
+    BLOCK_B: tl.constexpr,
+):
+    """
+    Computing NewLengths = Lengths + scalar and NewOffsets as the complete
+    cumsum of NewLengths, scanning Lengths in a single program.
+    """
+    tl.store(
+        NewOffsets + tl.arange(0, 1),
+        tl.zeros((1,), dtype=NewOffsets.dtype.element_ty),
+    )
+    carry = tl.zeros((1,), dtype=tl.int64)
+    for start in range(0, B, BLOCK_B):
+        offs_b = start + tl.arange(0, BLOCK_B)
+        mask_b = offs_b < B
+        lengths = tl.load(Lengths + offs_b, mask=mask_b, other=0).to(tl.int64)
+        lengths = tl.where(mask_b, lengths + scalar, 0)
+        tl.store(
+            NewLengths + offs_b,
+            lengths.to(NewLengths.dtype.element_ty),
+            mask=mask_b,
+        )
+        offsets = tl.cumsum(lengths, axis=0) + carry
+        tl.store(
+            NewOffsets + 1 + offs_b,
+            offsets.to(NewOffsets.dtype.element_ty),
+            mask=mask_b,
+        )
+        carry += tl.sum(lengths, axis=0)
+
+
+@torch.fx.wrap
+def triton_add_scalar_and_cumsum(
+    lengths: torch.Tensor,
+    scalar: int,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    lengths = switch_to_contiguous_if_needed(lengths)
+    B = lengths.size(0)
+    new_lengths = torch.empty_like(lengths)
+    new_offsets = torch.empty((B + 1,), dtype=lengths.dtype, device=lengths.device)
+    _add_scalar_and_cumsum[(1,)](
+        Lengths=lengths,
+        NewLengths=new_lengths,
+        NewOffsets=new_offsets,
+        B=B,
+        scalar=scalar,
+        BLOCK_B=min(max(triton.next_power_of_2(B), 16), 1024),
+    )
+    return new_lengths, new_offsets
@@ -0,0 +1,241 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python3
+
+# pyre-strict
+
+from typing import List, Optional
+
+import torch
+
+# @manual=//triton:triton
+import triton
+
+# @manual=//triton:triton
+import triton.language as tl
+
+from generative_recommenders.common import (
+    switch_to_contiguous_if_needed,
+    triton_autotune,
+)
+
+
+def _get_swish_layer_norm_mlp_fwd_configs() -> List[triton.Config]:
+    configs = []
+    for BLOCK_M in [16, 32, 64]:
+        for BLOCK_K in [32, 64]:
+            for BLOCK_N in [32, 64]:
+                for num_warps in [4, 8]:
+                    configs.append(
+                        triton.Config(
+                            {
+                                "BLOCK_M": BLOCK_M,
+                                "BLOCK_K": BLOCK_K,
+                                "BLOCK_N": BLOCK_N,
+                            },
+                            num_stages=2,
+                            num_warps=num_warps,
+                        )
+                    )
+    return configs
+
+
+@triton_autotune(
+    configs=_get_swish_layer_norm_mlp_fwd_configs(),
+    key=["K", "H", "N"],
+)
+@triton.jit
+def _swish_layer_norm_mlp_fwd(
+    X,
+    W1,
+    B1,
+    LN1W,
+    LN1B,
+    W2,
+    B2,
+    LN2W,
+    LN2B,
+    R,
+    Y,
+    M,
+    K,
+    H,
+    N,
+    eps1,
+    eps2,
+    stride_xm,
+    stride_w1h,
+    stride_w1k,
+    stride_w2n,
+    stride_w2h,
+    stride_rm,
+    stride_ym,
+    HAS_RESIDUAL: tl.constexpr,
+    ALLOW_TF32: tl.constexpr,
+    BLOCK_M: tl.constexpr,
+    BLOCK_K: tl.constexpr,
+    BLOCK_H: tl.constexpr,
+    BLOCK_N: tl.constexpr,
+):
+    pid_m = tl.program_id(0)
+    offs_m = pid_m * BLOCK_M + tl.arange(0, BLOCK_M)
+    mask_m = offs_m < M
+    offs_k = tl.arange(0, BLOCK_K)
+    offs_h = tl.arange(0, BLOCK_H)
+    mask_h = offs_h < H
+
+    # h = x @ W1^T + b1, the whole hidden row stays in registers
+    h = tl.zeros((BLOCK_M, BLOCK_H), dtype=tl.float32)
+    x_ptrs = X + offs_m[:, None].to(tl.int64) * stride_xm + offs_k[None, :]
+    w1_ptrs = W1 + offs_h[None, :] * stride_w1h + offs_k[:, None] * stride_w1k
+    for k in range(0, tl.cdiv(K, BLOCK_K)):
+        mask_k = offs_k < K - k * BLOCK_K
+        x = tl.load(x_ptrs, mask=mask_m[:, None] & mask_k[None, :], other=0.0)
+        w1 = tl.load(w1_ptrs, mask=mask_k[:, None] & mask_h[None, :], other=0.0)
+        w1 = w1.to(X.dtype.element_ty)
+        h += tl.dot(x, w1, allow_tf32=ALLOW_TF32)
+        x_ptrs += BLOCK_K
+        w1_ptrs += BLOCK_K * stride_w1k
+    b1 = tl.load(B1 + offs_h, mask=mask_h, other=0.0).to(tl.float32)
+    h = (h + b1[None, :]).to(Y.dtype.element_ty).to(tl.float32)
+
+    # swish layer norm: h * sigmoid(layer_norm(h))
+    mean1 = tl.sum(h, axis=1) / H
+    h_mean = tl.where(mask_h[None, :], h - mean1[:, None], 0.0)
+    var1 = tl.sum(h_mean * h_mean, axis=1) / H
+    rstd1 = 1 / tl.sqrt(var1 + eps1)
+    ln1_w = tl.load(LN1W + offs_h, mask=mask_h, other=0.0).to(tl.float32)
+    ln1_b = tl.load(LN1B + offs_h, mask=mask_h, other=0.0).to(tl.float32)
+    ln1 = h_mean * rstd1[:, None] * ln1_w[None, :] + ln1_b[None, :]
+    h = (h * tl.sigmoid(ln1)).to(Y.dtype.element_ty)
+
+    # y = h @ W2^T + b2 is computed once, one BLOCK_N slice at a time. Each
+    # slice is stored unnormalized into Y and its mean and sum of squared
+    # deviations are merged into the running row stats (Chan et al.), which
+    # stays accurate when |mean| >> std, unlike E[y^2] - E[y]^2.
+    mean2 = tl.zeros((BLOCK_M,), dtype=tl.float32)
+    m2 = tl.zeros((BLOCK_M,), dtype=tl.float32)
+    count = 0.0
+    for n in range(0, tl.cdiv(N, BLOCK_N)):
+        offs_n = n * BLOCK_N + tl.arange(0, BLOCK_N)
+        mask_n = offs_n < N
+        w2 = tl.load(
+            W2 + offs_n[None, :] * stride_w2n + offs_h[:, None] * stride_w2h,
+            mask=mask_h[:, None] & mask_n[None, :],
+            other=0.0,
+        ).to(Y.dtype.element_ty)
+        b2 = tl.load(B2 + offs_n, mask=mask_n, other=0.0).to(tl.float32)
+        y = (tl.dot(h, w2, allow_tf32=ALLOW_TF32) + b2[None, :]).to(Y.dtype.element_ty)
+        tl.store(
+            Y + offs_m[:, None].to(tl.int64) * stride_ym + offs_n[None, :],
+            y,
+            mask=mask_m[:, None] & mask_n[None, :],
+        )
+        y = y.to(tl.float32)
+        block_count = tl.minimum(N - n * BLOCK_N, BLOCK_N).to(tl.float32)
+        block_mean = tl.sum(tl.where(mask_n[None, :], y, 0.0), axis=1) / block_count
+        y_mean = tl.where(mask_n[None, :], y - block_mean[:, None], 0.0)
+        block_m2 = tl.sum(y_mean * y_mean, axis=1)
+        new_count = count + block_count
+        delta = block_mean - mean2
+        mean2 += delta * (block_count / new_count)
+        m2 += block_m2 + delta * delta * (count * block_count / new_count)
+        count = new_count
+    rstd2 = 1 / tl.sqrt(m2 / N + eps2)
+    # the unnormalized slices were stored by other threads of this program
+    tl.debug_barrier()
+    for n in range(0, tl.cdiv(N, BLOCK_N)):
+        offs_n = n * BLOCK_N + tl.arange(0, BLOCK_N)
+        mask_n = offs_n < N
+        y_ptrs = Y + offs_m[:, None].to(tl.int64) * stride_ym + offs_n[None, :]
+        y = tl.load(y_ptrs, mask=mask_m[:, None] & mask_n[None, :], other=0.0)
+        y = y.to(tl.float32)
+        ln2_w = tl.load(LN2W + offs_n, mask=mask_n, other=0.0).to(tl.float32)
+        ln2_b = tl.load(LN2B + offs_n, mask=mask_n, other=0.0).to(tl.float32)
+        y = (y - mean2[:, None]) * rstd2[:, None] * ln2_w[None, :] + ln2_b[None, :]
+        if HAS_RESIDUAL:
+            # y + R is fused here instead of a separate pass over the output
+            r = tl.load(
+                R + offs_m[:, None].to(tl.int64) * stride_rm + offs_n[None, :],
+                mask=mask_m[:, None] & mask_n[None, :],
+                other=0.0,
+            )
+            y = y.to(Y.dtype.element_ty).to(tl.float32) + r.to(tl.float32)
+        tl.store(
+            y_ptrs,
+            y.to(Y.dtype.element_ty),
+            mask=mask_m[:, None] & mask_n[None, :],
+        )
+
+
+@torch.fx.wrap
+def triton_swish_layer_norm_mlp_fwd(
+    x: torch.Tensor,
+    w1: torch.Tensor,
+    b1: torch.Tensor,
+    ln1_weight: torch.Tensor,
+    ln1_bias: torch.Tensor,
+    w2: torch.Tensor,
+    b2: torch.Tensor,
+    ln2_weight: torch.Tensor,
+    ln2_bias: torch.Tensor,
+    eps1: float,
+    eps2: float,
+    residual: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    x = switch_to_contiguous_if_needed(x)
+    if residual is not None:
+        residual = switch_to_contiguous_if_needed(residual)
+    M, K = x.shape
+    H, K1 = w1.shape
+    N, H2 = w2.shape
+    assert K == K1, f"incompatible dimensions {K}, {K1}"
+    assert H == H2, f"incompatible dimensions {H}, {H2}"
+    y = torch.empty((M, N), device=x.device, dtype=x.dtype)
+    if M == 0:
+        return y
+
+    grid = lambda meta: (triton.cdiv(M, meta["BLOCK_M"]),)  # noqa E731
+    _swish_layer_norm_mlp_fwd[grid](
+        x,
+        w1,
+        b1,
+        ln1_weight,
+        ln1_bias,
+        w2,
+        b2,
+        ln2_weight,
+        ln2_bias,
+        residual,
+        y,
+        M,
+        K,
+        H,
+        N,
+        eps1,
+        eps2,
+        x.stride(0),
+        w1.stride(0),
+        w1.stride(1),
+        w2.stride(0),
+        w2.stride(1),
+        residual.stride(0) if residual is not None else 0,
+        y.stride(0),
+        # pyre-ignore[6]
+        HAS_RESIDUAL=residual is not None,
+        ALLOW_TF32=torch.backends.cuda.matmul.allow_tf32,
+        BLOCK_H=max(triton.next_power_of_2(H), 16),
+    )
+    return y